@@ -0,0 +1,84 @@
+import argparse
+import http.client
+import os
+import resource
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+# Handler classes of server.py to compare: the plain SimpleHTTPRequestHandler
+# copies files through Python, CachedFileHandler uses sendfile() for files too
+# large for its cache.
+HANDLERS = ["SimpleHTTPRequestHandler", "CachedFileHandler"]
+
+SERVER = """
+import server
+from http.server import SimpleHTTPRequestHandler
+handler = {handler}
+handler.protocol_version = "HTTP/1.1"
+server.run(handler_class=handler, port={port}, directory={directory!r})
+"""
+
+
+def wait_for_server(port):
+    for _ in range(100):
+        try:
+            c = http.client.HTTPConnection("localhost", port)
+            c.request("HEAD", "/")
+            c.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("server did not start")
+
+def bench(handler, directory, size, port, repeat):
+    handler = handler if handler.startswith("Simple") else f"server.{handler}"
+    proc = subprocess.Popen(
+        [sys.executable, "-c", SERVER.format(handler=handler, port=port, directory=directory)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_server(port)
+        c = http.client.HTTPConnection("localhost", port)
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            c.request("GET", "/big.bin")
+            r = c.getresponse()
+            received = 0
+            while chunk := r.read(1 << 20):
+                received += len(chunk)
+            assert received == size
+        elapsed = time.perf_counter() - t0
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait()
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Large file serving benchmark")
+    parser.add_argument("--size", type=int, help="File size in MB", default=300)
+    parser.add_argument("--repeat", type=int, help="Downloads per handler", default=3)
+    parser.add_argument("--port", type=int, help="Port to serve HTTP on", default=8898)
+    args = parser.parse_args()
+
+    size = args.size << 20
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "big.bin"), "wb") as f:
+            chunk = os.urandom(1 << 20)
+            for _ in range(args.size):
+                f.write(chunk)
+        for handler in HANDLERS:
+            before = resource.getrusage(resource.RUSAGE_CHILDREN)
+            elapsed = bench(handler, directory, size, args.port, args.repeat)
+            after = resource.getrusage(resource.RUSAGE_CHILDREN)
+            cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+            total = size * args.repeat
+            print(f"{handler:26} {total / elapsed / 1e6:8.1f} MB/s "
+                  f"{cpu:6.2f} s server CPU ({cpu / total * 1e9:.2f} ns/byte)")
+
+
+if __name__ == "__main__":
+    main()
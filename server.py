@@ -1,20 +1,592 @@
 import os
+import io
 import argparse
+import signal
+import socket
+import stat
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate, parsedate_to_datetime
+from http import HTTPStatus
 from http.server import HTTPServer, SimpleHTTPRequestHandler
 
 
+# Connections are handled by a bounded pool of worker threads, so a slow
+# client only blocks its own worker.
+class PooledHTTPServer(HTTPServer):
+
+    def __init__(self, server_address, handler_class, workers=32):
+        # set up before binding, server_close() runs if the bind fails
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="http")
+        self.slots = threading.BoundedSemaphore(workers)
+        self.connections = set()
+        # connections waiting for their next request, oldest first
+        self.idle = {}
+        # connections taken over from their worker, see detach()
+        self.detached = set()
+        self.lock = threading.Lock()
+        self.live_reload = None
+        super().__init__(server_address, handler_class)
+
+    def process_request(self, request, client_address):
+        # Wait for a free worker before accepting more connections.  When all
+        # of them are taken, the one held longest by an idle keep-alive
+        # connection is freed, so idle clients can't lock out new ones.
+        if not self.slots.acquire(blocking=False):
+            self.close_idle()
+            self.slots.acquire()
+        with self.lock:
+            self.connections.add(request)
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            with self.lock:
+                self.connections.discard(request)
+                self.idle.pop(request, None)
+                detached = request in self.detached
+                self.detached.discard(request)
+            if not detached:
+                self.shutdown_request(request)
+            self.slots.release()
+
+    # Hands the connection over to something else once its handler is done,
+    # e.g. an event stream, so it doesn't hold a worker until it closes.
+    def detach(self, request):
+        with self.lock:
+            self.connections.discard(request)
+            self.idle.pop(request, None)
+            self.detached.add(request)
+
+    def mark_idle(self, request, idle):
+        with self.lock:
+            self.idle.pop(request, None)
+            if idle and request in self.connections:
+                self.idle[request] = None
+
+    def close_idle(self):
+        with self.lock:
+            request = next(iter(self.idle), None)
+            if request is None:
+                return
+            del self.idle[request]
+            try:
+                # its worker sees EOF and finishes
+                request.shutdown(socket.SHUT_RD)
+            except OSError:
+                pass
+
+    def server_close(self):
+        super().server_close()
+        if self.live_reload:
+            self.live_reload.close()
+        # Idle keep-alive connections see EOF and close, responses in progress
+        # are still written.
+        with self.lock:
+            for request in self.connections:
+                try:
+                    request.shutdown(socket.SHUT_RD)
+                except OSError:
+                    pass
+        self.executor.shutdown(wait=True)
+
+
+# Tells browsers to reload through Server-Sent Events whenever the manifest,
+# which the site generator writes last in every build, changes.  The event
+# streams are written by the polling thread, so open pages don't take up any
+# of the server's workers.
+class LiveReload:
+
+    path = "/__livereload"
+    script = (
+        b'<script>new EventSource("/__livereload").onmessage = () => location.reload();</script>'
+    )
+
+    def __init__(self, watched, on_change=None, interval=0.1, ping=15):
+        self.watched = watched
+        self.on_change = on_change
+        self.interval = interval
+        self.ping = ping
+        self.version = 0
+        self.closed = False
+        self.changed = threading.Condition()
+        self.streams = set()
+        threading.Thread(target=self.poll, name="livereload", daemon=True).start()
+
+    def mtime(self):
+        try:
+            return os.stat(self.watched).st_mtime_ns
+        except OSError:
+            return None
+
+    def poll(self):
+        last = self.mtime()
+        pinged = time.monotonic()
+        while not self.closed:
+            time.sleep(self.interval)
+            mtime = self.mtime()
+            if mtime != last:
+                last = mtime
+                if self.on_change:
+                    self.on_change()
+                with self.changed:
+                    self.version += 1
+                    self.changed.notify_all()
+                self.send(b"data: reload\n\n")
+            elif time.monotonic() - pinged >= self.ping:
+                # finds out about clients that went away
+                self.send(b": ping\n\n")
+                pinged = time.monotonic()
+
+    # Adds the socket of an event stream whose headers have been sent.
+    def add(self, sock):
+        sock.setblocking(False)
+        with self.changed:
+            if self.closed:
+                self.drop(sock)
+            else:
+                self.streams.add(sock)
+
+    # Writes an event to all streams.  A client that doesn't take a few
+    # bytes right away is stuck or gone, it is dropped and its browser
+    # reconnects.
+    def send(self, event):
+        with self.changed:
+            for sock in list(self.streams):
+                try:
+                    sent = sock.send(event)
+                except OSError:
+                    sent = 0
+                if sent < len(event):
+                    self.streams.discard(sock)
+                    self.drop(sock)
+
+    @staticmethod
+    def drop(sock):
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
+
+    # Waits up to timeout seconds for a build newer than version and returns
+    # the current version.
+    def wait(self, version, timeout):
+        with self.changed:
+            self.changed.wait_for(lambda: self.version != version or self.closed, timeout)
+            return self.version
+
+    def close(self):
+        with self.changed:
+            self.closed = True
+            self.changed.notify_all()
+            for sock in self.streams:
+                self.drop(sock)
+            self.streams.clear()
+
+    @classmethod
+    def inject(cls, html):
+        i = html.rfind(b"</body>")
+        if i < 0:
+            return html + cls.script
+        return html[:i] + cls.script + html[i:]
+
+
+class KeepAliveHandler(SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Idle keep-alive connections are closed after this many seconds, or
+    # earlier by a PooledHTTPServer that needs their worker.
+    timeout = 15
+    # headers and body are separate writes, don't let Nagle delay the body
+    disable_nagle_algorithm = True
+
+    # A connection is idle from when it is accepted or a response is done
+    # until the next request line has been read.
+    def setup(self):
+        super().setup()
+        self.mark_idle(True)
+
+    def handle_one_request(self):
+        super().handle_one_request()
+        if not self.close_connection:
+            self.mark_idle(True)
+
+    def parse_request(self):
+        self.mark_idle(False)
+        return super().parse_request()
+
+    def mark_idle(self, idle):
+        mark_idle = getattr(self.server, "mark_idle", None)
+        if mark_idle:
+            mark_idle(self.connection, idle)
+
+
+class CachedFile:
+
+    __slots__ = ("mtime", "size", "data", "etag", "last_modified", "checked", "encoded")
+
+    def __init__(self, st, data, checked):
+        self.mtime = st.st_mtime_ns
+        self.size = st.st_size
+        self.data = data
+        self.etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+        self.last_modified = formatdate(st.st_mtime, usegmt=True)
+        self.checked = checked
+        # compressed data by content coding, None if compression doesn't pay
+        self.encoded = {}
+
+    def cost(self):
+        return self.size + sum(len(data) for data in self.encoded.values() if data)
+
+
+# zlib window bits of the content codings the server compresses to
+ENCODINGS = {
+    "gzip": 31,
+    "deflate": 15,
+}
+
+
+# LRU cache of file contents bounded by max_bytes.  An entry is re-validated
+# against the file's mtime and size at most once per interval seconds, so
+# repeated hits in between don't touch the disk at all.
+class FileCache:
+
+    def __init__(self, max_bytes=64 << 20, max_file_size=1 << 20, interval=1.0):
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size
+        self.interval = interval
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None:
+                self.entries.move_to_end(path)
+                if now - entry.checked < self.interval:
+                    return entry
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        if entry is not None and st is not None and (
+            entry.mtime == st.st_mtime_ns and entry.size == st.st_size
+        ):
+            entry.checked = now
+            return entry
+        self.discard(path)
+        if st is None or not stat.S_ISREG(st.st_mode) or st.st_size > self.max_file_size:
+            return None
+        try:
+            with open(path, "rb") as f:
+                st = os.fstat(f.fileno())
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) != st.st_size:
+            return None
+        entry = CachedFile(st, data, now)
+        with self.lock:
+            if path in self.entries:
+                self.size -= self.entries.pop(path).cost()
+            self.entries[path] = entry
+            self.size += entry.size
+            self.evict()
+        return entry
+
+    # Returns the entry's data in the given content coding, or None if it is
+    # better sent uncompressed.  A precompressed .gz file written by the build
+    # is preferred to compressing on the fly.
+    def encode(self, path, entry, encoding):
+        if encoding == "gzip":
+            gz = self.get(path + ".gz")
+            if gz is not None and gz.mtime >= entry.mtime:
+                return gz.data
+        if encoding in entry.encoded:
+            return entry.encoded[encoding]
+        compressor = zlib.compressobj(6, zlib.DEFLATED, ENCODINGS[encoding])
+        data = compressor.compress(entry.data) + compressor.flush()
+        if len(data) >= entry.size:
+            data = None
+        with self.lock:
+            if self.entries.get(path) is entry and encoding not in entry.encoded:
+                entry.encoded[encoding] = data
+                self.size += len(data or b"")
+                self.evict()
+        return data
+
+    def evict(self):
+        while self.size > self.max_bytes:
+            self.size -= self.entries.popitem(last=False)[1].cost()
+
+    def discard(self, path):
+        with self.lock:
+            entry = self.entries.pop(path, None)
+            if entry is not None:
+                self.size -= entry.cost()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+class FileRange:
+
+    __slots__ = ("file", "offset", "count")
+
+    def __init__(self, file, offset, count):
+        self.file = file
+        self.offset = offset
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self.file.close()
+
+
+class CachedFileHandler(KeepAliveHandler):
+    # shared by all connections
+    cache = FileCache()
+    compressible_types = {
+        "application/javascript",
+        "application/json",
+        "application/xml",
+        "image/svg+xml",
+    }
+
+    def do_GET(self):
+        live_reload = getattr(self.server, "live_reload", None)
+        if live_reload and self.path == LiveReload.path:
+            self.send_events(live_reload)
+        else:
+            super().do_GET()
+
+    def send_events(self, live_reload):
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        detach = getattr(self.server, "detach", None)
+        if detach:
+            self.wfile.flush()
+            detach(self.connection)
+            live_reload.add(self.connection)
+            return
+        # other servers keep a thread on the stream until it closes
+        version = live_reload.version
+        try:
+            while not live_reload.closed:
+                current = live_reload.wait(version, self.timeout)
+                if current != version:
+                    self.wfile.write(b"data: reload\n\n")
+                    version = current
+                else:
+                    # finds out about clients that went away
+                    self.wfile.write(b": ping\n\n")
+        except OSError:
+            pass
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if self.path.split("?", 1)[0].split("#", 1)[0].endswith("/"):
+            path = os.path.join(path, "index.html")
+        entry = self.cache.get(path)
+        if entry is not None:
+            body = entry.data
+        else:
+            # too large for the cache, sent with sendfile()
+            try:
+                f = open(path, "rb")
+            except OSError:
+                # directories, listings and errors
+                return super().send_head()
+            st = os.fstat(f.fileno())
+            if not stat.S_ISREG(st.st_mode):
+                f.close()
+                return super().send_head()
+            entry = CachedFile(st, None, 0)
+            body = FileRange(f, 0, entry.size)
+        ctype = self.guess_type(path)
+        compressible = ctype.startswith("text/") or ctype in self.compressible_types
+        etag, encoding = entry.etag, None
+        live_reload = getattr(self.server, "live_reload", None)
+        if live_reload and ctype == "text/html" and entry.data is not None:
+            # pages get the live reload script and are sent uncompressed
+            body, etag = LiveReload.inject(body), f'{entry.etag[:-1]}-live"'
+            compressible = False
+        size = len(body)
+        byte_range = self.requested_range(entry, etag, size)
+        if compressible and byte_range is None:
+            if entry.data is not None:
+                encoding = self.accepted_encoding()
+                encoded = encoding and self.cache.encode(path, entry, encoding)
+            else:
+                # only the build's .gz, the file is too large to compress here
+                encoding = self.accepted_encoding(["gzip"])
+                encoded = encoding and self.open_precompressed(path, entry)
+                if encoded:
+                    body.close()
+            if encoded:
+                body, etag = encoded, f'{entry.etag[:-1]}-{encoding}"'
+            else:
+                encoding = None
+        not_modified = self.not_modified(entry, etag)
+        if not_modified:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+        elif byte_range is False:
+            self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+        else:
+            if byte_range:
+                start, end = byte_range
+                self.send_response(HTTPStatus.PARTIAL_CONTENT)
+                self.send_header("Content-Range", f"bytes {start}-{end - 1}/{size}")
+                if isinstance(body, FileRange):
+                    body.offset, body.count = start, end - start
+                else:
+                    body = body[start:end]
+            else:
+                self.send_response(HTTPStatus.OK)
+            self.send_header("Content-type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            if encoding:
+                self.send_header("Content-Encoding", encoding)
+        if compressible:
+            self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", entry.last_modified)
+        self.end_headers()
+        if not_modified or byte_range is False:
+            if isinstance(body, FileRange):
+                body.close()
+            return None
+        return body if isinstance(body, FileRange) else io.BytesIO(body)
+
+    def copyfile(self, source, outputfile):
+        if isinstance(source, FileRange):
+            if source.count > 0:
+                # os.sendfile() where available, no copies through Python
+                self.connection.sendfile(source.file, source.offset, source.count)
+        else:
+            super().copyfile(source, outputfile)
+
+    # The .gz the build wrote next to a file that isn't cached, as a FileRange,
+    # if it is at least as new as the file.
+    def open_precompressed(self, path, entry):
+        try:
+            f = open(path + ".gz", "rb")
+        except OSError:
+            return None
+        st = os.fstat(f.fileno())
+        if not stat.S_ISREG(st.st_mode) or st.st_mtime_ns < entry.mtime:
+            f.close()
+            return None
+        return FileRange(f, 0, st.st_size)
+
+    # (start, end) of a single satisfiable byte range, False for one that
+    # can't be satisfied and None to send the whole representation.
+    def requested_range(self, entry, etag, size):
+        header = self.headers.get("Range", "").strip()
+        if not header.startswith("bytes=") or "," in header:
+            return None
+        if_range = self.headers.get("If-Range")
+        if if_range is not None and if_range.strip() not in (etag, entry.last_modified):
+            return None
+        first, _, last = header[6:].strip().partition("-")
+        try:
+            if first == "":
+                length = int(last)
+                if length <= 0:
+                    return False
+                return max(0, size - length), size
+            start = int(first)
+            end = int(last) + 1 if last else size
+        except ValueError:
+            return None
+        if start < 0 or end <= start and last:
+            return None
+        if start >= size:
+            return False
+        return start, min(end, size)
+
+    # The content coding the client prefers among the given ones.
+    def accepted_encoding(self, encodings=ENCODINGS):
+        accepted = {}
+        for coding in self.headers.get("Accept-Encoding", "").split(","):
+            name, _, params = coding.partition(";")
+            q = 1.0
+            for param in params.split(";"):
+                key, _, value = param.strip().partition("=")
+                if key == "q":
+                    try:
+                        q = float(value)
+                    except ValueError:
+                        q = 0.0
+            accepted[name.strip().lower()] = q
+        best = max(encodings, key=lambda e: accepted.get(e, accepted.get("*", 0.0)))
+        if accepted.get(best, accepted.get("*", 0.0)) > 0:
+            return best
+        return None
+
+    def not_modified(self, entry, etag):
+        if "If-None-Match" in self.headers:
+            tags = [t.strip() for t in self.headers["If-None-Match"].split(",")]
+            return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
+        if "If-Modified-Since" in self.headers:
+            try:
+                since = parsedate_to_datetime(self.headers["If-Modified-Since"])
+            except (TypeError, IndexError, OverflowError, ValueError):
+                return False
+            if since.tzinfo is None:
+                return False
+            return entry.mtime // 1_000_000_000 <= since.timestamp()
+        return False
+
 def run(
-    server_class=HTTPServer,
-    handler_class=SimpleHTTPRequestHandler,
+    server_class=PooledHTTPServer,
+    handler_class=CachedFileHandler,
     port=8888,
     directory=None,
+    workers=32,
+    live_reload=False,
 ):
     if directory:  # Change the current working directory if directory is specified
         os.chdir(directory)
     server_address = ("", port)
-    httpd = server_class(server_address, handler_class)
+    if server_class is PooledHTTPServer:
+        httpd = server_class(server_address, handler_class, workers)
+    else:
+        httpd = server_class(server_address, handler_class)
+    if live_reload:
+        # written by src/main.py at the end of every build
+        cache = getattr(handler_class, "cache", None)
+        httpd.live_reload = LiveReload(".manifest.json", cache.clear if cache else None)
+    # serve_forever() has to be stopped from another thread
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=httpd.shutdown).start())
     print(f"Serving HTTP on http://localhost:{port} from directory '{directory}'...")
-    httpd.serve_forever()
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # lets the workers finish the requests in progress
+        httpd.server_close()
 
 
 if __name__ == "__main__":
@@ -23,7 +595,12 @@ if __name__ == "__main__":
         "--dir", type=str, help="Directory to serve files from", default="."
     )
     parser.add_argument("--port", type=int, help="Port to serve HTTP on", default=8888)
+    parser.add_argument(
+        "--workers", type=int, help="Number of worker threads", default=32
+    )
+    parser.add_argument(
+        "--live-reload", action="store_true", help="Reload pages in the browser after builds"
+    )
     args = parser.parse_args()
 
-    run(port=args.port, directory=args.dir)
-
+    run(port=args.port, directory=args.dir, workers=args.workers, live_reload=args.live_reload)
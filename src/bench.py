@@ -0,0 +1,153 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import timeit
+
+from blocks import BlockType, block_to_block_type, markdown_to_blocks
+from conversion import text_node_to_html_node, text_to_textnodes
+from parentnode import ParentNode
+
+words = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit"]
+inline = ["**bold**", "*italic*", "`code`"]
+links = ["[boot dev](https://www.boot.dev)", "![rick roll](https://i.imgur.com/aKaOqIh.gif)"]
+
+def sentence(rng, n, extra=(), ratio=0.0):
+    return " ".join(
+        rng.choice(extra) if extra and rng.random() < ratio else rng.choice(words)
+        for _ in range(n)
+    )
+
+# Deterministic synthetic markdown by corpus name, scale multiplies its size.
+def corpus(name, scale=1, seed=0):
+    rng = random.Random(seed)
+    blocks = []
+    match name:
+        case "paragraphs":
+            for _ in range(2000 * scale):
+                blocks.append(sentence(rng, 60, inline, 0.1))
+        case "lists":
+            for _ in range(1000 * scale):
+                blocks.append("\n".join(f"- {sentence(rng, 8, inline, 0.1)}" for _ in range(8)))
+                blocks.append("\n".join(f"{i}. {sentence(rng, 8)}" for i in range(1, 10)))
+        case "links":
+            for _ in range(2000 * scale):
+                blocks.append(sentence(rng, 40, links, 0.3))
+        case "nested":
+            # markdown has no nested blocks here, so nesting comes from the
+            # tree below and from markup inside links and emphasis
+            for i in range(2000 * scale):
+                blocks.append(f"> [**{sentence(rng, 3)}** *{sentence(rng, 3)}*](https://www.boot.dev/{i})")
+                blocks.append(f"**{sentence(rng, 5)} *{sentence(rng, 5)}* `code`** {sentence(rng, 10, links, 0.2)}")
+        case "huge":
+            blocks.append(sentence(rng, 200000 * scale, inline + links, 0.1))
+        case _:
+            raise ValueError(f"unknown corpus '{name}'")
+    return "\n\n".join(blocks)
+
+CORPORA = ["paragraphs", "lists", "links", "nested", "huge"]
+NESTED_DEPTH = 1000
+
+def best(f, repeat):
+    return min(timeit.repeat(f, number=1, repeat=repeat))
+
+# Times each stage of the markdown -> HTML path on its own, fed with the
+# output of the previous stage.
+def bench_corpus(name, scale=1, repeat=5):
+    markdown = corpus(name, scale)
+    results = {}
+
+    def record(stage, seconds, size, nodes):
+        results[stage] = {
+            "seconds": seconds,
+            "mb_per_s": size / seconds / 1e6,
+            "nodes_per_s": nodes / seconds,
+        }
+
+    seconds = best(lambda: markdown_to_blocks(markdown), repeat)
+    blocks = markdown_to_blocks(markdown)
+    record("markdown_to_blocks", seconds, len(markdown), len(blocks))
+
+    size = sum(len(b) for b in blocks)
+    seconds = best(lambda: [block_to_block_type(b) for b in blocks], repeat)
+    types = [block_to_block_type(b) for b in blocks]
+    record("block_to_block_type", seconds, size, len(blocks))
+
+    # the inline parser sees whole blocks, code blocks are not parsed
+    texts = [b for b, t in zip(blocks, types) if t != BlockType.CODE]
+    seconds = best(lambda: [text_to_textnodes(t) for t in texts], repeat)
+    text_nodes = [text_to_textnodes(t) for t in texts]
+    count = sum(len(n) for n in text_nodes)
+    record("text_to_textnodes", seconds, sum(len(t) for t in texts), count)
+
+    seconds = best(lambda: [[text_node_to_html_node(n) for n in ns] for ns in text_nodes], repeat)
+    leafs = [[text_node_to_html_node(n) for n in ns] for ns in text_nodes]
+    record("text_node_to_html_node", seconds, sum(len(n.text) for ns in text_nodes for n in ns), count)
+
+    children = [ParentNode("p", ls) for ls in leafs]
+    if name == "nested":
+        node = ParentNode("div", [])
+        for i in range(0, len(children), NESTED_DEPTH):
+            chain = children[i:i + NESTED_DEPTH]
+            for child in reversed(chain[1:]):
+                chain[0] = ParentNode("blockquote", [child, chain[0]])
+            node.children.append(chain[0])
+        root = node
+    else:
+        root = ParentNode("div", children)
+    seconds = best(root.to_html, repeat)
+    record("to_html", seconds, len(root.to_html()), count + 2 * len(children) + 1)
+    return results
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, stages in results.items():
+        for stage, result in stages.items():
+            base = baseline.get(name, {}).get(stage)
+            if base is None:
+                continue
+            ratio = result["seconds"] / base["seconds"]
+            mark = ""
+            if ratio > 1 + threshold:
+                mark = "  REGRESSION"
+                regressions.append((name, stage, ratio))
+            print(f"{name:12} {stage:24} {ratio:6.2f}x baseline time{mark}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Markdown to HTML benchmarks")
+    parser.add_argument("corpora", nargs="*", help="Corpora to run", default=CORPORA)
+    parser.add_argument("--scale", type=int, help="Corpus size multiplier", default=1)
+    parser.add_argument("--repeat", type=int, help="Runs per stage, the best counts", default=5)
+    parser.add_argument("--save", type=str, help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", type=str, help="JSON results to compare against")
+    parser.add_argument(
+        "--threshold", type=float, help="Allowed slowdown against the baseline", default=0.2
+    )
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.corpora:
+        results[name] = bench_corpus(name, args.scale, args.repeat)
+        for stage, r in results[name].items():
+            print(f"{name:12} {stage:24} {r['seconds'] * 1e3:9.2f} ms "
+                  f"{r['mb_per_s']:8.1f} MB/s {r['nodes_per_s'] / 1e3:9.1f} k nodes/s")
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "scale": args.scale,
+                "results": results,
+            }, f, indent=1)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("scale") != args.scale:
+            print(f"warning: baseline was run with --scale {baseline.get('scale')}")
+        if compare(results, baseline["results"], args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
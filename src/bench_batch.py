@@ -0,0 +1,37 @@
+import random
+import timeit
+
+from bench import inline, links, sentence
+from conversion import markdown_to_html_many, markdown_to_html_node
+
+# Snippets like the fields an importer converts: a share of short repeated
+# labels, single paragraphs and small documents.
+def snippets(n=20000, seed=0):
+    rng = random.Random(seed)
+    docs = []
+    for _ in range(n):
+        r = rng.random()
+        if r < 0.3:
+            docs.append(rng.choice(["", "Read more", "**New**", "[Contact](/contact)"]))
+        elif r < 0.7:
+            docs.append(sentence(rng, 12, inline + links, 0.2))
+        else:
+            docs.append(f"## {sentence(rng, 3)}\n\n{sentence(rng, 20, inline, 0.1)}\n\n"
+                        f"- {sentence(rng, 3)}\n- {sentence(rng, 4)}")
+    return docs
+
+def bench(number=5):
+    docs = snippets()
+    html = [markdown_to_html_node(doc).to_html() for doc in docs]
+    assert markdown_to_html_many(docs) == html
+    print(f"{len(docs)} snippets, {sum(map(len, docs)) / 1e6:.1f} MB")
+    for label, f in [
+        ("one by one", lambda: [markdown_to_html_node(doc).to_html() for doc in docs]),
+        ("batch", lambda: markdown_to_html_many(docs)),
+        ("batch, no interning", lambda: markdown_to_html_many(docs, intern_length=0)),
+    ]:
+        t = min(timeit.repeat(f, number=1, repeat=number))
+        print(f"  {label:20} {t * 1e3:8.2f} ms {len(docs) / t / 1e3:8.1f} k snippets/s")
+
+if __name__ == "__main__":
+    bench()
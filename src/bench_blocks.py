@@ -0,0 +1,88 @@
+import random
+import re
+import timeit
+
+from blocks import BlockType, block_to_block_type, markdown_to_blocks
+
+# block_to_block_type as it was before the one-scan classifier, kept as the
+# reference the benchmark compares against.
+legacy_block_type_re = {
+    BlockType.HEADING: re.compile("#{1,6} "),
+    BlockType.CODE: re.compile("```.*```$", re.DOTALL),
+}
+
+legacy_block_lines_type_re = {
+    BlockType.QUOTE: re.compile(r"(>) "),
+    BlockType.UNORDERED_LIST: re.compile(r"([-*]) "),
+    BlockType.ORDERED_LIST: re.compile(r"([0-9]?)\. "),
+}
+
+def legacy_next_start(block_type, prev_start, this_start):
+    match block_type:
+        case BlockType.UNORDERED_LIST:
+            if prev_start is None:
+                return True, this_start
+            return prev_start == this_start, prev_start
+        case BlockType.ORDERED_LIST:
+            try:
+                this_start = int(this_start)
+                return prev_start == this_start, this_start + 1
+            except ValueError:
+                pass
+            return False, prev_start + 1
+        case default:
+            return True, None
+
+def legacy_block_to_block_type(block):
+    for t in legacy_block_type_re:
+        if legacy_block_type_re[t].match(block):
+            return t
+    for t in legacy_block_lines_type_re:
+        start = 1 if t == BlockType.ORDERED_LIST else None
+        for l in block.split("\n"):
+            m = legacy_block_lines_type_re[t].match(l)
+            if not m:
+                break
+            ok, start = legacy_next_start(t, start, m.group(1))
+            if not ok:
+                break
+        else:
+            return t
+    return BlockType.PARAGRAPH
+
+words = ["lorem", "ipsum", "dolor", "sit", "amet", "**bold**", "*italic*", "`code`", "1.", "-", ">"]
+
+def paragraph(rng, lines):
+    return "\n".join(
+        " ".join(rng.choice(words) for _ in range(12)) for _ in range(lines)
+    )
+
+def corpus(name, seed=0):
+    rng = random.Random(seed)
+    match name:
+        case "short paragraphs":
+            parts = [paragraph(rng, 1) for _ in range(5000)]
+        case "long paragraphs":
+            parts = [paragraph(rng, 40) for _ in range(500)]
+        case "mixed":
+            parts = []
+            for i in range(1000):
+                parts.append(f"## Heading {i}")
+                parts.append(paragraph(rng, 8))
+                parts.append("\n".join(f"- item {j}" for j in range(6)))
+                parts.append("\n".join(f"{j}. item" for j in range(1, 7)))
+                parts.append("\n".join(f"> quote {j}" for j in range(4)))
+    return "\n\n".join(parts)
+
+def bench(name, number=5):
+    blocks = markdown_to_blocks(corpus(name))
+    size = sum(len(b) for b in blocks)
+    assert [block_to_block_type(b) for b in blocks] == [legacy_block_to_block_type(b) for b in blocks]
+    print(f"{name}: {len(blocks)} blocks, {size / 1e6:.1f} MB")
+    for label, f in [("legacy", legacy_block_to_block_type), ("one-scan", block_to_block_type)]:
+        t = min(timeit.repeat(lambda: [f(b) for b in blocks], number=1, repeat=number))
+        print(f"  {label:10} {t * 1e3:8.2f} ms {size / t / 1e6:8.1f} MB/s")
+
+if __name__ == "__main__":
+    for name in ["short paragraphs", "long paragraphs", "mixed"]:
+        bench(name)
@@ -0,0 +1,43 @@
+import argparse
+
+from bench import best, corpus
+from blocks import BlockType, block_to_block_type, markdown_to_blocks
+from conversion import (
+    markdown_to_html_many, markdown_to_html_node, text_node_to_html_node, text_nodes_to_html,
+    text_to_textnodes,
+)
+
+# Inline HTML made through a LeafNode per text node and written directly
+# from the text nodes, and whole pages rendered through the node tree and
+# as strings.  Links carry a props dict each, so link-heavy pages gain the
+# most.
+def bench_corpus(name, repeat):
+    markdown = corpus(name)
+    texts = [b for b in markdown_to_blocks(markdown) if block_to_block_type(b) != BlockType.CODE]
+    text_nodes = [text_to_textnodes(t) for t in texts]
+    leafs = lambda: ["".join(text_node_to_html_node(n).to_html() for n in ns) for ns in text_nodes]
+    direct = lambda: ["".join(text_nodes_to_html(ns, [])) for ns in text_nodes]
+    if leafs() != direct():
+        raise AssertionError(f"{name}: inline HTML differs")
+    for label, tree, strings in [
+        ("inline", leafs, direct),
+        ("page", lambda: markdown_to_html_node(markdown).to_html(),
+         lambda: markdown_to_html_many([markdown])),
+    ]:
+        slow = best(tree, repeat)
+        fast = best(strings, repeat)
+        print(f"{name:12} {label:6} {slow * 1e3:9.2f} ms nodes {fast * 1e3:9.2f} ms direct "
+              f"{slow / fast:5.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="Inline HTML with and without leaf nodes")
+    parser.add_argument("corpora", nargs="*", help="Corpora to run",
+                        default=["links", "paragraphs", "nested"])
+    parser.add_argument("--repeat", type=int, help="Runs per corpus, the best counts", default=5)
+    args = parser.parse_args()
+    for name in args.corpora:
+        bench_corpus(name, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import re
+
+from bench import best, corpus
+from conversion import InlineRules, inline_rules, split_nodes_delimiter, text_to_textnodes
+from textnode import TextNode, TextType
+
+# Inline parse time as rules are added to the defaults, with all rules in the
+# one regex of text_to_textnodes and with a pass over the text nodes per rule
+# the way split_nodes_delimiter works.  The extra rules never match, as on a
+# site that registers syntax its pages rarely use.
+
+def with_extra_rules(n):
+    rules = InlineRules()
+    rules.elements = list(inline_rules.elements)
+    rules.delimiters = dict(inline_rules.delimiters)
+    rules.lenient = set(inline_rules.lenient)
+    rules.tags = dict(inline_rules.tags)
+    for i in range(n):
+        if i % 2:
+            rules.add_element(rf"\{{\{{rule{i}:([^}}]*)\}}\}}", lambda arg: TextNode(arg, TextType.TEXT))
+        else:
+            marker = chr(0x2460 + i) * 2
+            rules.add_delimiter(marker, f"rule{i}", "span")
+    return rules
+
+def split_nodes_element(old_nodes, regex, make):
+    nodes = []
+    for node in old_nodes:
+        if node.text_type != TextType.TEXT:
+            nodes.append(node)
+            continue
+        run = 0
+        for m in regex.finditer(node.text):
+            if run < m.start():
+                nodes.append(TextNode(node.text[run:m.start()], TextType.TEXT))
+            nodes.append(make(*m.groups()))
+            run = m.end()
+        if run < len(node.text) or run == 0:
+            nodes.append(TextNode(node.text[run:], TextType.TEXT))
+    return nodes
+
+def per_rule_passes(rules):
+    elements = [
+        (re.compile(pattern if until is None else f"{pattern}(.*?){re.escape(until)}", re.S), make)
+        for pattern, make, until, strict in rules.elements
+    ]
+    delimiters = sorted(rules.delimiters.items(), key=lambda d: len(d[0]), reverse=True)
+
+    def parse(text):
+        nodes = [TextNode(text, TextType.TEXT)]
+        for regex, make in elements:
+            nodes = split_nodes_element(nodes, regex, make)
+        for marker, text_type in delimiters:
+            nodes = split_nodes_delimiter(nodes, marker, text_type)
+        return nodes
+    return parse
+
+def main():
+    parser = argparse.ArgumentParser(description="Inline parse time by number of inline rules")
+    parser.add_argument("--counts", type=int, nargs="*", help="Extra rules to add",
+                        default=[0, 4, 16, 64])
+    parser.add_argument("--repeat", type=int, help="Runs per count, the best counts", default=5)
+    args = parser.parse_args()
+
+    texts = corpus("paragraphs").split("\n\n") + corpus("links").split("\n\n")
+    size = sum(len(t) for t in texts)
+    print(f"{'rules':>5} {'one regex':>12} {'per rule':>12}")
+    for n in args.counts:
+        rules = with_extra_rules(n)
+        passes = per_rule_passes(rules)
+        combined = best(lambda: [text_to_textnodes(t, rules=rules) for t in texts], args.repeat)
+        separate = best(lambda: [passes(t) for t in texts], args.repeat)
+        count = len(rules.elements) + len(rules.delimiters)
+        print(f"{count:5} {size / combined / 1e6:7.1f} MB/s {size / separate / 1e6:7.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import random
+import sys
+import tracemalloc
+
+from blocks import block_to_block_type, markdown_to_blocks, markdown_to_spans
+from conversion import markdown_to_html_node
+from leafnode import LeafNode
+from nodearena import NONE, NodeArena
+from parentnode import ParentNode
+from textnode import TextNode, TextType
+
+# Subclasses without __slots__ get a per-instance __dict__ again, they show
+# what the node classes would cost without their slots.
+class DictTextNode(TextNode):
+    pass
+
+class DictLeafNode(LeafNode):
+    pass
+
+words = ["lorem", "ipsum", "dolor", "sit", "amet", "**bold**", "*italic*", "`code`",
+         "[link](https://www.boot.dev)", "![image](https://www.boot.dev/img.png)"]
+
+def page(rng):
+    blocks = [f"# Page {rng.randrange(1 << 16)}"]
+    for _ in range(20):
+        blocks.append(" ".join(rng.choice(words) for _ in range(40)))
+    blocks.append("\n".join(f"- {rng.choice(words)} {rng.choice(words)}" for _ in range(10)))
+    return "\n\n".join(blocks)
+
+def render_site(pages):
+    return [markdown_to_html_node(markdown) for markdown in pages]
+
+def render_site_arena(pages):
+    arena = NodeArena()
+    for markdown in pages:
+        arena.add_markdown(NONE, markdown)
+    return arena
+
+def count_nodes(node):
+    if isinstance(node, ParentNode):
+        return 1 + sum(count_nodes(c) for c in node.children)
+    return 1
+
+def bytes_per_instance(factory, n=100000):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    nodes = [factory(i) for i in range(n)]
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del nodes
+    # the list holding the nodes is not part of the node size
+    return size / n - sys.getsizeof([None] * n) / n
+
+def bench(pages=500, seed=0):
+    for label, factory in [
+        ("TextNode", lambda i: TextNode(None, TextType.TEXT)),
+        ("TextNode (__dict__)", lambda i: DictTextNode(None, TextType.TEXT)),
+        ("LeafNode", lambda i: LeafNode(None, None)),
+        ("LeafNode (__dict__)", lambda i: DictLeafNode(None, None)),
+        ("ParentNode", lambda i: ParentNode(None, None)),
+    ]:
+        print(f"{label:20} {bytes_per_instance(factory):6.1f} bytes/node")
+    rng = random.Random(seed)
+    markdown = [page(rng) for _ in range(pages)]
+    for label, render, count in [
+        ("site", render_site, lambda site: sum(count_nodes(p) for p in site)),
+        ("site (arena)", render_site_arena, len),
+    ]:
+        tracemalloc.start()
+        site = render(markdown)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        nodes = count(site)
+        del site
+        print(f"{label}: {pages} pages, {nodes} nodes, {current / 1e6:.1f} MB live, "
+              f"{peak / 1e6:.1f} MB peak, {current / nodes:.1f} bytes/node incl. strings")
+
+    # All pages as one document, split and classified as copied blocks and
+    # as spans into the document.
+    document = "\n\n".join(markdown)
+    for label, split in [
+        ("blocks", lambda: [(b, block_to_block_type(b)) for b in markdown_to_blocks(document)]),
+        ("spans", lambda: markdown_to_spans(document)),
+    ]:
+        tracemalloc.start()
+        blocks = split()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del blocks
+        print(f"{label:6} of a {len(document) / 1e6:.1f} MB document: {current / 1e6:.1f} MB live, "
+              f"{peak / 1e6:.1f} MB peak")
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,71 @@
+import argparse
+import hashlib
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench import corpus
+
+# Renders one page either read into a string or memory-mapped, in a process
+# of its own so its peak RSS can be measured.
+RENDER = """
+import main
+main.LARGE_PAGE = {large_page}
+main.generate_page("page.md", {content!r}, {dest!r}, "<html>{{{{ Content }}}}</html>")
+"""
+
+MODES = {
+    "read": 1 << 62,
+    "mmap": 0,
+}
+
+def write_page(path, size):
+    chunk = "\n\n".join(corpus(name) for name in ["paragraphs", "lists", "links"]) + "\n\n"
+    chunk = chunk.encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(b"# Huge page\n\n")
+        written = 0
+        while written < size:
+            f.write(chunk)
+            written += len(chunk)
+    return os.path.getsize(path)
+
+def render(mode, content, dest):
+    code = RENDER.format(large_page=MODES[mode], content=content, dest=dest)
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-c", code], cwd=os.path.dirname(__file__) or ".")
+    _, status, rusage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    elapsed = time.perf_counter() - start
+    if proc.returncode:
+        return elapsed, rusage.ru_maxrss << 10, None
+    with open(os.path.join(dest, "page.html"), "rb") as f:
+        digest = hashlib.file_digest(f, "sha256").hexdigest()
+    return elapsed, rusage.ru_maxrss << 10, digest
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak RSS of rendering one huge page")
+    parser.add_argument("--size", type=int, help="Size of the page in MB", default=1024)
+    parser.add_argument("modes", nargs="*", help="Modes to run", default=list(MODES))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        content = os.path.join(tmp, "content")
+        os.makedirs(content)
+        size = write_page(os.path.join(content, "page.md"), args.size << 20)
+        digests = set()
+        for mode in args.modes:
+            elapsed, rss, digest = render(mode, content, os.path.join(tmp, mode))
+            digests.add(digest)
+            status = "" if digest else "  FAILED"
+            print(f"{mode:5} {size / 1e6:8.1f} MB page {elapsed:8.2f} s "
+                  f"{rss / 1e6:8.1f} MB peak RSS{status}")
+        if len(digests) > 1:
+            print("outputs differ")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
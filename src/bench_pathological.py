@@ -0,0 +1,99 @@
+import argparse
+import sys
+import time
+import tracemalloc
+
+from blocks import markdown_to_spans
+from conversion import markdown_to_html_node, spans_to_html_node
+
+# Adversarial markdown by name, made of n repetitions of what a parser could
+# take for the start of something.  Pages from untrusted users can be made of
+# nothing else, parse time has to stay linear in their length for all of
+# them.
+PATHOLOGICAL = {
+    "open brackets": lambda n: "[" * n,
+    "nested brackets": lambda n: "[" * n + "a" + "]" * n + "(b)",
+    "nested links": lambda n: "[a](" * n + ")" * n,
+    "unclosed links": lambda n: "[a](b" * n,
+    "unclosed images": lambda n: "![a](b" * n,
+    "bracketed urls": lambda n: "[a](b[c]" * n,
+    "link texts": lambda n: "[a]" * n,
+    "unclosed autolinks": lambda n: "<https://a" * n,
+    "italic flood": lambda n: "*" * n,
+    "bold flood": lambda n: "**" * n,
+    "code flood": lambda n: "`" * n,
+    "strikethrough flood": lambda n: "~~" * n,
+    "broken strikethrough": lambda n: "~~a *b* " * n,
+    # valid throughout, later markers are literal inside earlier ones' spans
+    "mixed delimiters": lambda n: "**a*`~~`*b** *c`~~`* `~~` ~~d~~ " * n,
+    "long line": lambda n: "lorem *ipsum* [dolor](sit) " * n,
+    "long word": lambda n: "a" * n,
+    "blank lines": lambda n: "\n" * n,
+    "space lines": lambda n: " \n" * n,
+    "list items": lambda n: "- *a*\n" * n,
+    "ordered items": lambda n: "1. a\n" * n,
+    "quote lines": lambda n: "> a\n" * n,
+    "code fences": lambda n: "```\n" * n,
+}
+
+# Both ways of parsing a page, each from markdown to HTML.
+PARSERS = {
+    "blocks": lambda markdown: markdown_to_html_node(markdown).to_html(),
+    "spans": lambda markdown: spans_to_html_node(markdown_to_spans(markdown)).to_html(),
+}
+
+# Seconds parse took, invalid markdown is parsed until it is found invalid.
+def parse_time(parse, markdown):
+    start = time.perf_counter()
+    try:
+        parse(markdown)
+    except ValueError:
+        pass
+    return time.perf_counter() - start
+
+def peak_memory(parse, markdown):
+    tracemalloc.start()
+    try:
+        parse(markdown)
+    except ValueError:
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse time of adversarial markdown")
+    parser.add_argument("inputs", nargs="*", help="Inputs to run", default=list(PATHOLOGICAL))
+    parser.add_argument("-n", type=int, help="Repetitions in an input", default=20000)
+    parser.add_argument("--limit", type=float, help="Seconds an input may take", default=1.0)
+    parser.add_argument("--memory", action="store_true", help="Also measure peak memory")
+    args = parser.parse_args()
+
+    # Time at 4n over time at n is about 4 for a linear parser, 16 for a
+    # quadratic one.  Growth is only judged where the time is long enough to
+    # measure.
+    failed = False
+    for name in args.inputs:
+        markdown = PATHOLOGICAL[name](args.n)
+        larger = PATHOLOGICAL[name](4 * args.n)
+        for label, parse in PARSERS.items():
+            seconds = parse_time(parse, markdown)
+            larger_seconds = parse_time(parse, larger)
+            growth = larger_seconds / max(seconds, 1e-6)
+            line = (f"{name:20} {label:6} {len(markdown) / 1e6:6.2f} MB {seconds * 1e3:9.2f} ms "
+                    f"{growth:5.1f}x at 4n")
+            if args.memory:
+                line += f" {peak_memory(parse, markdown) / len(markdown):7.1f} bytes/char peak"
+            if seconds > args.limit:
+                line += "  OVER LIMIT"
+                failed = True
+            elif growth > 8 and larger_seconds > 0.05:
+                line += "  SUPERLINEAR"
+                failed = True
+            print(line)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import random
+
+import htmlnode
+from bench import best
+from htmlnode import PropsCache, render_props
+from leafnode import LeafNode
+from parentnode import ParentNode
+
+# Serialization of pages whose links and icons mostly repeat: a navigation
+# bar and footer on every page and content links to the same few pages.
+def site(pages, seed=0):
+    rng = random.Random(seed)
+    nav = [LeafNode("a", f"Section {i}", {"href": f"/section/{i}/", "class": "nav"}) for i in range(20)]
+    icons = [{"src": f"/static/icon-{i}.svg", "alt": f"icon {i}", "width": "16"} for i in range(10)]
+    root = ParentNode("div", [])
+    for page in range(pages):
+        content = []
+        for _ in range(50):
+            content.append(LeafNode(None, "lorem ipsum dolor sit amet "))
+            if rng.random() < 0.3:
+                content.append(LeafNode("a", "a link", {"href": f"/posts/{rng.randrange(200)}/"}))
+            if rng.random() < 0.1:
+                content.append(LeafNode("img", "", dict(rng.choice(icons))))
+        root.children.append(ParentNode("article", [
+            ParentNode("nav", list(nav)),
+            ParentNode("p", content),
+            ParentNode("footer", list(nav)),
+        ], {"id": f"page-{page}"}))
+    return root
+
+# props_to_html as it was, concatenated and not escaped.
+def concatenated(props):
+    html = ""
+    if props:
+        for prop in props:
+            html += f' {prop}="{props[prop]}"'
+    return html
+
+def main():
+    parser = argparse.ArgumentParser(description="Attribute rendering with and without a cache")
+    parser.add_argument("--pages", type=int, help="Pages in the site", default=1000)
+    parser.add_argument("--repeat", type=int, help="Runs per way, the best counts", default=5)
+    args = parser.parse_args()
+
+    root = site(args.pages)
+    cache = PropsCache()
+    original = htmlnode.props_to_html
+    for label, props_to_html in [
+        ("concatenated", concatenated),
+        ("escaped", lambda props: render_props(props) if props else ""),
+        ("escaped, cached", lambda props: cache.get(props) if props else ""),
+    ]:
+        htmlnode.props_to_html = props_to_html
+        try:
+            seconds = best(root.to_html, args.repeat)
+        finally:
+            htmlnode.props_to_html = original
+        print(f"{label:16} {seconds * 1e3:9.2f} ms")
+    stats = cache.stats()
+    print(f"cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import hashlib
+import os
+import sqlite3
+import time
+
+from conversion import RENDERER_VERSION
+
+# Rendered HTML of blocks by the sha256 of their markdown, kept in an SQLite
+# database so it survives between builds and can be shared by the worker
+# processes of one.  The database's user_version is the RENDERER_VERSION its
+# HTML was rendered with, it is emptied when that changes.
+#
+# Inserts and the last use of hits are buffered until flush() or until the
+# inserts add up to 4 MB, evict() trims the least recently used blocks until
+# their HTML fits into max_size bytes.  The last use is only updated once it
+# is a minute old, and commits are not synced, a cache lost in a crash is
+# simply started over.
+class BlockCache:
+
+    # seconds to wait for another process's lock
+    timeout = 60
+
+    def __init__(self, path, max_size=256 << 20):
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.inserts = []
+        self.inserted = 0
+        self.used = []
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            self.db = self.connect()
+        except sqlite3.OperationalError:
+            # e.g. locked or unreadable, the database is fine
+            raise
+        except sqlite3.DatabaseError:
+            # not a database, nothing in there is worth keeping
+            for name in [path, path + "-wal", path + "-shm"]:
+                try:
+                    os.remove(name)
+                except FileNotFoundError:
+                    pass
+            self.db = self.connect()
+
+    def connect(self):
+        db = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=OFF")
+            with db:
+                db.execute("BEGIN IMMEDIATE")
+                db.execute("CREATE TABLE IF NOT EXISTS blocks ("
+                           "key BLOB PRIMARY KEY, html TEXT, size INTEGER, used REAL"
+                           ") WITHOUT ROWID")
+                db.execute("CREATE INDEX IF NOT EXISTS blocks_used ON blocks (used)")
+                if db.execute("PRAGMA user_version").fetchone()[0] != RENDERER_VERSION:
+                    db.execute("DELETE FROM blocks")
+                    db.execute(f"PRAGMA user_version = {int(RENDERER_VERSION)}")
+        except sqlite3.DatabaseError:
+            db.close()
+            raise
+        return db
+
+    @staticmethod
+    def key(block):
+        return hashlib.sha256(block.encode("utf-8")).digest()
+
+    def get(self, block):
+        key = self.key(block)
+        row = self.db.execute("SELECT html, used FROM blocks WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if row[1] < time.time() - 60:
+            self.used.append(key)
+        return row[0]
+
+    def put(self, block, html):
+        size = len(html.encode("utf-8"))
+        self.inserts.append((self.key(block), html, size))
+        self.inserted += size
+        if self.inserted >= 4 << 20:
+            self.flush()
+
+    def flush(self):
+        if not (self.inserts or self.used):
+            return
+        now = time.time()
+        with self.db:
+            self.db.execute("BEGIN IMMEDIATE")
+            self.db.executemany(
+                "INSERT OR REPLACE INTO blocks VALUES (?, ?, ?, ?)",
+                [(key, html, size, now) for key, html, size in self.inserts],
+            )
+            self.db.executemany(
+                "UPDATE blocks SET used = ? WHERE key = ?", [(now, key) for key in self.used]
+            )
+        self.inserts = []
+        self.inserted = 0
+        self.used = []
+
+    def size(self):
+        return self.db.execute("SELECT COALESCE(SUM(size), 0) FROM blocks").fetchone()[0]
+
+    # Returns the number of blocks evicted.
+    def evict(self):
+        self.flush()
+        with self.db:
+            self.db.execute("BEGIN IMMEDIATE")
+            excess = self.size() - self.max_size
+            if excess <= 0:
+                return 0
+            # the oldest blocks whose HTML adds up to the excess
+            return self.db.execute(
+                "DELETE FROM blocks WHERE key IN (SELECT key FROM ("
+                "SELECT key, SUM(size) OVER (ORDER BY used, key) - size AS before FROM blocks"
+                ") WHERE before < ?)", (excess,)
+            ).rowcount
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+_caches = {}
+
+# One BlockCache per database and process, a forked worker must not use the
+# connection of its parent.
+def open_block_cache(path, max_size=256 << 20):
+    key = (os.getpid(), os.path.abspath(path), max_size)
+    if key not in _caches:
+        _caches[key] = BlockCache(path, max_size)
+    return _caches[key]
@@ -1,3 +1,5 @@
+import mmap
+import os
 import re
 
 class BlockType:
@@ -8,62 +10,173 @@ class BlockType:
     UNORDERED_LIST = "unordered list"
     ORDERED_LIST = "ordered list"
 
-def markdown_to_blocks(markdown):
-    blocks = []
+def lines_to_blocks(lines):
     block = []
-    for line in markdown.split("\n"):
+    for line in lines:
         line = line.strip()
         if line == "":
             if len(block) > 0:
-                blocks.append("\n".join(block))
+                yield "\n".join(block)
                 block = []
         else:
             block.append(line)
     if len(block) > 0:
-        blocks.append("\n".join(block))
-    return blocks
+        yield "\n".join(block)
+
+def markdown_to_blocks(markdown):
+    return list(lines_to_blocks(markdown.split("\n")))
+
+# Yields the blocks of a text stream (or of the file at a path) while reading
+# it, so only the current block is held in memory.
+def iter_markdown_blocks(source):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, encoding="utf-8") as f:
+            yield from lines_to_blocks(f)
+    else:
+        yield from lines_to_blocks(source)
+
+# Line breaks the way open() in text mode translates them, and the ASCII
+# whitespace str.strip() removes.  A line of only these is blank for sure,
+# lines blank because of other Unicode whitespace are found by
+# lines_to_blocks after decoding.
+blank_line_bytes_re = re.compile(
+    rb"(?:\r\n|\r(?!\n)|\n)[ \t\f\v\x1c-\x1f]*(?:\r\n|\r(?!\n)|\n)"
+)
+
+# Yields the blocks of UTF-8 markdown in a bytes-like object, e.g. an mmap of
+# a file too large to read into a string, the same blocks as
+# markdown_to_blocks of the file read in text mode.  Boundaries are found in
+# the bytes, only the text between two blank lines is decoded at a time.  Of
+# an mmap, the pages already scanned are released every release bytes, so
+# the resident size stays small.
+def iter_buffer_blocks(buf, release = 64 << 20):
+    pos = released = 0
+    size = len(buf)
+    while pos < size:
+        m = blank_line_bytes_re.search(buf, pos)
+        end = m.start() if m else size
+        if end > pos:
+            text = str(buf[pos:end], "utf-8")
+            if "\r" in text:
+                text = text.replace("\r\n", "\n").replace("\r", "\n")
+            yield from lines_to_blocks(text.split("\n"))
+        pos = m.end() if m else size
+        if pos - released >= release and hasattr(buf, "madvise"):
+            start = released - released % mmap.PAGESIZE
+            end = pos - pos % mmap.PAGESIZE
+            buf.madvise(mmap.MADV_DONTNEED, start, end - start)
+            released = end
 
 block_type_re = {
     BlockType.HEADING: re.compile("#{1,6} "),
     BlockType.CODE: re.compile("```.*```$", re.DOTALL),
 }
 
-block_lines_type_re = {
-    BlockType.QUOTE: re.compile(r"(>) "),
-    BlockType.UNORDERED_LIST: re.compile(r"([-*]) "),
-    BlockType.ORDERED_LIST: re.compile(r"([0-9]?)\. "),
+# Marker every line of a block of that type starts with.  Ordered list items
+# have to be numbered 1. to 9. in sequence.
+block_line_prefix = {
+    ">": "> ",
+    "-": "- ",
+    "*": "* ",
 }
+ordered_list_prefixes = [f"{i}. " for i in range(1, 10)]
 
-def next_start(block_type, prev_start, this_start):
-    match block_type:
-        case BlockType.UNORDERED_LIST:
-            if prev_start is None:
-                return True, this_start
-            return prev_start == this_start, prev_start
-        case BlockType.ORDERED_LIST:
-            try:
-                this_start = int(this_start)
-                return prev_start == this_start, this_start + 1
-            except ValueError:
-                pass
-            return False, prev_start + 1
-        case default:
-            return True, None
-
-def block_to_block_type(block):
-    for t in block_type_re:
-        if block_type_re[t].match(block):
-            return t
-    for t in block_lines_type_re:
-        start = 1 if t == BlockType.ORDERED_LIST else None
-        for l in block.split("\n"):
-            m = block_lines_type_re[t].match(l)
-            if not m:
-                break
-            ok, start = next_start(t, start, m.group(1))
-            if not ok:
+# Classifies block, or the part of it from start to end, without copying it.
+def block_to_block_type(block, start = 0, end = None):
+    if end is None:
+        end = len(block)
+    first = block[start:start + 1]
+    if first == "#":
+        if block_type_re[BlockType.HEADING].match(block, start, end):
+            return BlockType.HEADING
+    elif first == "`":
+        if block_type_re[BlockType.CODE].match(block, start, end):
+            return BlockType.CODE
+    elif first in block_line_prefix:
+        prefix = block_line_prefix[first]
+        if block.startswith(prefix, start, end) and (
+            block.count("\n", start, end) == block.count("\n" + prefix, start, end)
+        ):
+            return BlockType.QUOTE if first == ">" else BlockType.UNORDERED_LIST
+    elif first == "1":
+        off = start
+        for prefix in ordered_list_prefixes:
+            if not block.startswith(prefix, off, end):
                 break
-        else:
-            return t
+            off = block.find("\n", off, end) + 1
+            if off == 0:
+                return BlockType.ORDERED_LIST
     return BlockType.PARAGRAPH
 
+# A block as offsets into the markdown it is part of.  The block starts and
+# ends with the first and last character that isn't whitespace.  A clean span
+# has no whitespace around its inner lines either, so the block is
+# source[start:end] as is and can be parsed in place.
+class BlockSpan:
+
+    __slots__ = ("source", "start", "end", "block_type", "clean")
+
+    def __init__(self, source, start, end, block_type = None, clean = True):
+        self.source = source
+        self.start = start
+        self.end = end
+        self.block_type = block_type
+        self.clean = clean
+
+    # The block as markdown_to_blocks returns it.
+    def text(self):
+        text = self.source[self.start:self.end]
+        if self.clean:
+            return text
+        return "\n".join(line.strip() for line in text.split("\n"))
+
+    # Offsets of the lines of a clean span as (start, end) pairs.
+    def lines(self):
+        start = self.start
+        while (end := self.source.find("\n", start, self.end)) != -1:
+            yield start, end
+            start = end + 1
+        yield start, self.end
+
+    # 1-based line and column the block starts at.
+    def position(self):
+        line_start = self.source.rfind("\n", 0, self.start) + 1
+        return self.source.count("\n", 0, self.start) + 1, self.start - line_start + 1
+
+    def __repr__(self):
+        return f"BlockSpan({self.start}, {self.end}, {self.block_type}, clean={self.clean})"
+
+    def __eq__(self, other):
+        return (self.source is other.source and
+                self.start == other.start and
+                self.end == other.end and
+                self.block_type == other.block_type and
+                self.clean == other.clean)
+
+# A blank line between two blocks, the first character that isn't whitespace
+# and a line break inside of a block with whitespace around it.  Whitespace
+# is what str.strip() removes from a line, a block has no two line breaks in
+# a row.  The patterns start with a literal where possible, which re finds
+# much faster than a character class.
+blank_line_re = re.compile(r"\n[^\S\n]*\n")
+non_space_re = re.compile(r"\S")
+line_space_re = re.compile(r"\n(?:(?<=\s\n)|(?=\s))")
+
+# Yields the classified BlockSpans of the blocks markdown_to_blocks returns.
+def iter_block_spans(markdown):
+    pos = 0
+    while m := non_space_re.search(markdown, pos):
+        start = m.start()
+        blank = blank_line_re.search(markdown, start)
+        pos = end = blank.start() if blank else len(markdown)
+        while markdown[end - 1].isspace():
+            end -= 1
+        if line_space_re.search(markdown, start, end):
+            span = BlockSpan(markdown, start, end, clean=False)
+            span.block_type = block_to_block_type(span.text())
+        else:
+            span = BlockSpan(markdown, start, end, block_to_block_type(markdown, start, end))
+        yield span
+
+def markdown_to_spans(markdown):
+    return list(iter_block_spans(markdown))
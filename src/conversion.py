@@ -1,7 +1,16 @@
 import re
+from collections import OrderedDict
+from contextlib import contextmanager
+from html import escape
 
+from blocks import BlockType, block_to_block_type, markdown_to_blocks
 from textnode import TextNode, TextType
 from leafnode import LeafNode
+from parentnode import ParentNode
+
+# Bump whenever a change makes the generated HTML differ, so builds don't
+# reuse output rendered by an older version.
+RENDERER_VERSION = 5
 
 
 def text_node_to_html_node(text_node):
@@ -17,6 +26,9 @@ def text_node_to_html_node(text_node):
         return LeafNode("a", text_node.text, {"href": text_node.url})
     if text_node.text_type == TextType.IMAGE:
         return LeafNode("img", "",  {"src": text_node.url, "alt": text_node.text})
+    if text_node.text_type in inline_rules.tags:
+        # spans of delimiters added to the inline rules
+        return LeafNode(inline_rules.tags[text_node.text_type], text_node.text)
     raise ValueError(f"unknown text type '{text_node.text_type}'")
 
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
@@ -34,23 +46,47 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
             new_nodes.append(old_node)
     return new_nodes
 
-element_re = re.compile(r"(!?)\[([^]]*)\]\(([^)]*)\)")
+# Matches the start of a link up to its URL, which runs to the next ).  The
+# text of a link may not contain a [, so the scan for its end stops where the
+# next link could start.
+element_re = re.compile(r"(!?)\[([^]\[]*)\]\(")
 _LINK    = 0x01
 _IMAGE   = 0x02
 _EXTRACT = 0x00
 _SPLIT   = 0x10
 
+# Index of the next until in text[pos:end], or -1.  Indexes are remembered in
+# found and only searched for again once pos is past them, so text full of
+# unclosed links, e.g. URLs without a ), is still scanned in linear time.
+def find_until(text, until, pos, end, found):
+    i = found.get(until)
+    if i is None or 0 <= i < pos:
+        i = found[until] = text.find(until, pos, end)
+    return i
+
+# Yields (start, end, "!" or "", text, url) of the links and images in text.
+def iter_markdown_elements(text):
+    found = {}
+    pos = 0
+    while m := element_re.search(text, pos):
+        url_end = find_until(text, ")", m.end(), len(text), found)
+        if url_end < 0:
+            pos = m.start() + 1
+            continue
+        pos = url_end + 1
+        yield m.start(), pos, m.group(1), m.group(2), text[m.end():url_end]
+
 def handle_markdown_elements(text, what = _LINK | _IMAGE):
     elements = []
     off = 0
-    for m in element_re.finditer(text):
+    for start, end, bang, label, url in iter_markdown_elements(text):
         if (
-            m.group(1) == "" and (what & _LINK) == _LINK
+            bang == "" and (what & _LINK) == _LINK
             or
-            m.group(1) == "!" and (what & _IMAGE) == _IMAGE
+            bang == "!" and (what & _IMAGE) == _IMAGE
         ):
             if (what & _SPLIT) == _SPLIT:
-                t0, (t1, off) = off, m.span()
+                t0, t1, off = off, start, end
                 if t0 < t1:
                     elements.append(TextNode(text[t0:t1], TextType.TEXT))
                 if (what & _LINK) == _LINK:
@@ -59,9 +95,9 @@ def handle_markdown_elements(text, what = _LINK | _IMAGE):
                     text_type = TextType.IMAGE
                 else:
                     text_type = TextType.TEXT
-                elements.append(TextNode(m.group(2), text_type, m.group(3)))
+                elements.append(TextNode(label, text_type, url))
             else:
-                elements.append((m.group(2), m.group(3)))
+                elements.append((label, url))
     if (what & _SPLIT) == _SPLIT and (len(elements) == 0 or off < len(text)):
         elements.append(TextNode(text[off:], TextType.TEXT))
     return elements
@@ -90,10 +126,429 @@ def split_nodes_link(old_nodes):
             nodes.append(node)
     return nodes
 
-def text_to_textnodes(text):
-    nodes = split_nodes_link(split_nodes_image([TextNode(text, TextType.TEXT)]))
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+# Inline syntax of text_to_textnodes, compiled into one alternation, so text
+# is tokenized by a single left-to-right scan however many rules there are.
+#
+# Element rules match a whole construct, e.g. a link, and make its TextNode
+# from the groups of their pattern.  The construct is consumed as a whole,
+# markers inside of it stay literal.  Delimiter rules open and close a span of
+# their text type with a marker.  Inside an open span, markers added later
+# are literal and markers added earlier are a syntax error.
+#
+# A rule added with strict=False never makes text invalid, so syntax can be
+# added without breaking pages that happen to contain it: its element inside
+# a span is literal, and so is its marker when the span it opens is unclosed
+# or invalid.
+#
+# Every rule starts with a literal character, which the regex engine uses to
+# skip to the next place where any rule can match, so text without inline
+# syntax costs the same whatever the number of rules.  As the patterns become
+# part of one regex, they can't use named groups or backreferences.
+#
+# An element may run to the next occurrence of a string, its until, e.g. a
+# link's URL to the next ).  Its pattern then matches the part before, and
+# the text up to the until is passed to make after the pattern's groups.  If
+# there is no until left, the element is literal text.
+#
+# The regex engine tries a rule again at every place its first character
+# occurs.  To keep parsing linear in the length of the text, a pattern must
+# not scan past the next place where it could start again, e.g. a link's text
+# stops at the next [ whether it matched or not.  Untils are found with
+# find_until, which never searches the same part of the text twice.
+class InlineRules:
+
+    def __init__(self):
+        self.elements = []
+        self.delimiters = {}
+        # text types of delimiters added with strict=False
+        self.lenient = set()
+        self.tags = {}
+        self.html_tags = {}
+        self.regex = None
+
+    def add_element(self, pattern, make, until = None, strict = True):
+        self.split_first(pattern)
+        self.elements.append((pattern, make, until, strict))
+        self.regex = None
+
+    def add_delimiter(self, marker, text_type, tag, strict = True):
+        self.delimiters[marker] = text_type
+        if strict:
+            self.lenient.discard(text_type)
+        else:
+            self.lenient.add(text_type)
+        self.tags[text_type] = tag
+        self.html_tags[text_type] = (f"<{tag}>", f"</{tag}>")
+        self.regex = None
+
+    @staticmethod
+    def split_first(pattern):
+        m = first_literal_re.match(pattern)
+        if m is None or pattern[m.end():m.end() + 1] in ("*", "+", "?", "{"):
+            raise ValueError(f"inline rule '{pattern}' doesn't start with a literal character")
+        return m.group(), pattern[m.end():]
+
+    # Each rule is its first character followed by a group with the rest, the
+    # group that matched is the match's lastindex.
+    def compile(self):
+        alternatives = []
+        # by group: the element's make with the slice of match.groups() that
+        # its pattern's groups are, its until and strict, and the text type
+        # of markers
+        self.element_groups = {}
+        self.marker_groups = {}
+        group = 1
+        for pattern, make, until, strict in self.elements:
+            first, rest = self.split_first(pattern)
+            groups = re.compile(rest).groups
+            alternatives.append(f"{first}({rest})")
+            self.element_groups[group] = (make, group, group + groups, until, strict)
+            group += 1 + groups
+        # longer markers first, so ** isn't taken for two *
+        for marker in sorted(self.delimiters, key=len, reverse=True):
+            alternatives.append(f"{re.escape(marker[0])}({re.escape(marker[1:])})")
+            self.marker_groups[group] = self.delimiters[marker]
+            group += 1
+        self.rank = {text_type: i for i, text_type in enumerate(self.delimiters.values())}
+        self.regex = re.compile("|".join(alternatives) or "(?!)")
+        return self.regex
+
+first_literal_re = re.compile(r"\\[^\w\s]|[^\\.^$*+?{}\[\]|()]")
+
+inline_rules = InlineRules()
+inline_rules.add_element(r"!\[([^]\[]*)\]\(", lambda alt, url: TextNode(alt, TextType.IMAGE, url), ")")
+inline_rules.add_element(r"\[([^]\[]*)\]\(", lambda text, url: TextNode(text, TextType.LINK, url), ")")
+inline_rules.add_element(r"<(https?://[^\s<>]+)>", lambda url: TextNode(url, TextType.LINK, url),
+                         strict=False)
+inline_rules.add_delimiter("**", TextType.BOLD, "b")
+inline_rules.add_delimiter("*", TextType.ITALIC, "i")
+inline_rules.add_delimiter("`", TextType.CODE, "code")
+inline_rules.add_delimiter("~~", TextType.STRIKETHROUGH, "del", strict=False)
+
+# Parses text, or the part of it from start to end, without copying it.
+def text_to_textnodes(text, start = 0, end = None, rules = inline_rules):
+    if end is None:
+        end = len(text)
+    search = (rules.regex or rules.compile()).search
+    element_groups = rules.element_groups
+    marker_groups = rules.marker_groups
+    rank = rules.rank
+    lenient_types = rules.lenient
+    nodes = []
+    span_type = TextType.TEXT
+    segment = run = pos = start
+    found = {}
+    # (nodes, run, pos) from before the open span's marker if the delimiter
+    # is lenient, to go back to if the span is invalid
+    lenient = None
+    while True:
+        try:
+            while m := search(text, pos, end):
+                t0, t1 = m.span()
+                pos = t1
+                text_type = marker_groups.get(m.lastindex)
+                if text_type is None:
+                    make, g0, g1, until, strict = element_groups[m.lastindex]
+                    args = m.groups()[g0:g1]
+                    if until is not None:
+                        i = find_until(text, until, t1, end, found)
+                        if i < 0:
+                            pos = t0 + 1
+                            continue
+                        args += (text[t1:i],)
+                        t1 = pos = i + len(until)
+                    if span_type != TextType.TEXT:
+                        if strict:
+                            raise ValueError("invalid Markdown syntax")
+                        continue
+                    if segment < t0:
+                        nodes.append(TextNode(text[run:t0], TextType.TEXT))
+                    nodes.append(make(*args))
+                    segment = run = t1
+                    continue
+                if span_type == TextType.TEXT:
+                    lenient = (len(nodes), run, t1) if text_type in lenient_types else None
+                    nodes.append(TextNode(text[run:t0], TextType.TEXT))
+                    span_type = text_type
+                elif span_type == text_type:
+                    nodes.append(TextNode(text[run:t0], text_type))
+                    span_type = TextType.TEXT
+                elif rank[span_type] < rank[text_type]:
+                    continue
+                else:
+                    raise ValueError("invalid Markdown syntax")
+                run = t1
+            if span_type != TextType.TEXT:
+                raise ValueError("invalid Markdown syntax")
+            break
+        except ValueError:
+            if span_type == TextType.TEXT or lenient is None:
+                raise
+            # the marker that opened the span is text, parsing goes on after it
+            count, run, pos = lenient
+            del nodes[count:]
+            span_type = TextType.TEXT
+            lenient = None
+    if segment < end or segment == start:
+        nodes.append(TextNode(text[run:end], TextType.TEXT))
     return nodes
 
+
+# Appends the HTML of the leaves text_node_to_html_node makes of nodes to
+# parts, without making the leaves.
+def text_nodes_to_html(nodes, parts):
+    append = parts.append
+    html_tags = inline_rules.html_tags
+    for node in nodes:
+        text_type = node.text_type
+        if text_type == TextType.TEXT:
+            append(node.text)
+        elif text_type in html_tags:
+            open_tag, close_tag = html_tags[text_type]
+            append(open_tag)
+            append(node.text)
+            append(close_tag)
+        elif text_type == TextType.LINK:
+            parts += ('<a href="', escape(node.url), '">', node.text, "</a>")
+        elif text_type == TextType.IMAGE:
+            parts += ('<img src="', escape(node.url), '" alt="', escape(node.text), '"></img>')
+        else:
+            raise ValueError(f"unknown text type '{text_type}'")
+    return parts
+
+
+# LRU memo of the HTML of inline text, bounded by the characters of the keys
+# and values it holds.  Fragments longer than max_length are not cached, as
+# what repeats across pages (navigation, footers, list items) is short.
+# Each process has its own cache, there is nothing shared to lock.
+class InlineCache:
+
+    def __init__(self, max_size=4 << 20, max_length=1024):
+        self.max_size = max_size
+        self.max_length = max_length
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, text):
+        html = self.entries.get(text)
+        if html is not None:
+            self.entries.move_to_end(text)
+            self.hits += 1
+            return html
+        self.misses += 1
+        html = "".join(text_nodes_to_html(text_to_textnodes(text), []))
+        self.entries[text] = html
+        self.size += len(text) + len(html)
+        while self.size > self.max_size:
+            text, html = self.entries.popitem(last=False)
+            self.size -= len(text) + len(html)
+            self.evictions += 1
+        return html
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "size": self.size,
+        }
+
+inline_cache = None
+
+# Memoizes the inline HTML of text_to_children from now on in this process,
+# None turns it off again.  Keeps the current cache if it has the same limits.
+def use_inline_cache(max_size=4 << 20, max_length=1024):
+    global inline_cache
+    if max_size is None:
+        inline_cache = None
+    elif inline_cache is None or (inline_cache.max_size, inline_cache.max_length) != (
+        max_size, max_length
+    ):
+        inline_cache = InlineCache(max_size, max_length)
+    return inline_cache
+
+# Memoizes with cache, an InlineCache or None for none, inside the with
+# block, and goes back to the cache in use before after it.
+@contextmanager
+def using_inline_cache(cache):
+    global inline_cache
+    previous, inline_cache = inline_cache, cache
+    try:
+        yield cache
+    finally:
+        inline_cache = previous
+
+def text_to_children(text, start = 0, end = None):
+    if end is None:
+        end = len(text)
+    if inline_cache is not None and end - start <= inline_cache.max_length:
+        # a tagless leaf renders its value as is
+        return [LeafNode(None, inline_cache.get(text[start:end]))]
+    return [text_node_to_html_node(node) for node in text_to_textnodes(text, start, end)]
+
+def block_to_html_node(block, block_type = None):
+    if block_type is None:
+        block_type = block_to_block_type(block)
+    match block_type:
+        case BlockType.HEADING:
+            level = len(block) - len(block.lstrip("#"))
+            return ParentNode(f"h{level}", text_to_children(block[level + 1:]))
+        case BlockType.CODE:
+            return ParentNode("pre", [LeafNode("code", block[3:-3].strip("\n"))])
+        case BlockType.QUOTE:
+            text = "\n".join(line[2:] for line in block.split("\n"))
+            return ParentNode("blockquote", text_to_children(text))
+        case BlockType.UNORDERED_LIST:
+            return ParentNode("ul", [
+                ParentNode("li", text_to_children(line[2:])) for line in block.split("\n")
+            ])
+        case BlockType.ORDERED_LIST:
+            return ParentNode("ol", [
+                ParentNode("li", text_to_children(line[3:])) for line in block.split("\n")
+            ])
+    return ParentNode("p", text_to_children(block.replace("\n", " ")))
+
+# block_to_html_node with a cache (e.g. a blockcache.BlockCache): the HTML of
+# a block rendered before is spliced in as is, other blocks are rendered and
+# added to it.
+def cached_block_to_html_node(block, cache):
+    html = cache.get(block)
+    if html is None:
+        parts = []
+        _block_html(block, parts)
+        html = "".join(parts)
+        cache.put(block, html)
+    # a tagless leaf renders its value as is
+    return LeafNode(None, html)
+
+# With lazy, the blocks (e.g. a generator) are only converted while the node
+# is written, so one block at a time is held in memory.
+def blocks_to_html_node(blocks, cache = None, lazy = False):
+    if cache is None:
+        children = map(block_to_html_node, blocks)
+    else:
+        children = (cached_block_to_html_node(block, cache) for block in blocks)
+    return ParentNode("div", children if lazy else list(children))
+
+# block_to_html_node of a BlockSpan, parsing clean spans in place.  Quotes
+# are parsed as a whole across their lines, so they are copied like unclean
+# spans.
+def span_to_html_node(span):
+    source, start, end = span.source, span.start, span.end
+    if not span.clean or span.block_type == BlockType.QUOTE:
+        return block_to_html_node(span.text(), span.block_type)
+    match span.block_type:
+        case BlockType.HEADING:
+            level = source.find(" ", start, end) - start
+            return ParentNode(f"h{level}", text_to_children(source, start + level + 1, end))
+        case BlockType.CODE:
+            return ParentNode("pre", [LeafNode("code", source[start + 3:end - 3].strip("\n"))])
+        case BlockType.UNORDERED_LIST:
+            return ParentNode("ul", [
+                ParentNode("li", text_to_children(source, s + 2, e)) for s, e in span.lines()
+            ])
+        case BlockType.ORDERED_LIST:
+            return ParentNode("ol", [
+                ParentNode("li", text_to_children(source, s + 3, e)) for s, e in span.lines()
+            ])
+    if source.find("\n", start, end) != -1:
+        return ParentNode("p", text_to_children(span.text().replace("\n", " ")))
+    return ParentNode("p", text_to_children(source, start, end))
+
+# blocks_to_html_node of BlockSpans.  With positions, every block element
+# gets the line it starts on in the markdown as data-source-line.  Errors
+# name the line and column of the block.
+def spans_to_html_node(spans, positions = False):
+    children = []
+    line = 1
+    offset = 0
+    for span in spans:
+        try:
+            node = span_to_html_node(span)
+        except ValueError as e:
+            raise ValueError("line {}, column {}: {}".format(*span.position(), e)) from e
+        if positions:
+            line += span.source.count("\n", offset, span.start)
+            offset = span.start
+            node.props = {"data-source-line": str(line)}
+        children.append(node)
+    return ParentNode("div", children)
+
+def markdown_to_html_node(markdown):
+    return blocks_to_html_node(markdown_to_blocks(markdown))
+
+# markdown_to_html_node(doc).to_html() of many documents, e.g. fields from a
+# CMS, in order.  With stream, the HTML is yielded as it is converted instead
+# of returned as a list.  Documents of up to intern_length characters are
+# converted once per batch and repeats share their HTML.
+def markdown_to_html_many(docs, stream = False, intern_length = 1024):
+    results = iter_markdown_to_html(docs, intern_length)
+    return results if stream else list(results)
+
+def iter_markdown_to_html(docs, intern_length = 1024):
+    interned = {}
+    # one buffer for the fragments of every document
+    parts = []
+    for i, doc in enumerate(docs):
+        html = interned.get(doc)
+        if html is None:
+            parts.append("<div>")
+            try:
+                for block in markdown_to_blocks(doc):
+                    _block_html(block, parts)
+            except ValueError as e:
+                parts.clear()
+                raise ValueError(f"document {i}: {e}") from e
+            parts.append("</div>")
+            html = "".join(parts)
+            parts.clear()
+            if len(doc) <= intern_length:
+                if len(interned) >= 1 << 16:
+                    interned.clear()
+                interned[doc] = html
+        yield html
+
+# Appends the HTML of the nodes of text_to_children(text) to parts, without
+# making the nodes.
+def _inline_html(text, parts):
+    text_nodes_to_html(text_to_textnodes(text), parts)
+
+# Appends the HTML of block_to_html_node(block) to parts, without making the
+# nodes.
+def _block_html(block, parts):
+    match block_to_block_type(block):
+        case BlockType.HEADING:
+            level = len(block) - len(block.lstrip("#"))
+            parts.append(f"<h{level}>")
+            _inline_html(block[level + 1:], parts)
+            parts.append(f"</h{level}>")
+        case BlockType.CODE:
+            parts.append("<pre><code>")
+            parts.append(block[3:-3].strip("\n"))
+            parts.append("</code></pre>")
+        case BlockType.QUOTE:
+            parts.append("<blockquote>")
+            _inline_html("\n".join(line[2:] for line in block.split("\n")), parts)
+            parts.append("</blockquote>")
+        case BlockType.UNORDERED_LIST | BlockType.ORDERED_LIST as block_type:
+            tag, skip = ("ul", 2) if block_type == BlockType.UNORDERED_LIST else ("ol", 3)
+            parts.append(f"<{tag}>")
+            for line in block.split("\n"):
+                parts.append("<li>")
+                _inline_html(line[skip:], parts)
+                parts.append("</li>")
+            parts.append(f"</{tag}>")
+        case _:
+            parts.append("<p>")
+            _inline_html(block.replace("\n", " "), parts)
+            parts.append("</p>")
+
+def extract_title(blocks):
+    for block in blocks:
+        if block.startswith("# "):
+            return block[2:].strip()
+    raise ValueError("missing title")
@@ -1,5 +1,12 @@
+import io
+from collections import OrderedDict
+from html import escape
+
+
 class HTMLNode:
 
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag = None, value = None, children = None, props = None):
         self.tag = tag
         self.value = value
@@ -9,12 +16,34 @@ class HTMLNode:
     def to_html(self):
         raise NotImplementedError()
 
+    def to_html_fragments(self):
+        yield self.to_html()
+
+    # Streams the HTML to a text or binary file-like object (e.g. a socket's
+    # makefile("wb")) in chunks of about chunk_size characters.
+    def write_html(self, out, encoding = "utf-8", chunk_size = 1 << 16):
+        binary = not isinstance(out, io.TextIOBase)
+        chunk = []
+        size = 0
+        for fragment in self.to_html_fragments():
+            chunk.append(fragment)
+            size += len(fragment)
+            if size >= chunk_size:
+                self._write_chunk(out, chunk, binary, encoding)
+                chunk = []
+                size = 0
+        self._write_chunk(out, chunk, binary, encoding)
+
+    @staticmethod
+    def _write_chunk(out, chunk, binary, encoding):
+        html = "".join(chunk)
+        if html:
+            out.write(html.encode(encoding) if binary else html)
+        if hasattr(out, "flush"):
+            out.flush()
+
     def props_to_html(self):
-        html = ""
-        if self.props:
-            for prop in self.props:
-                html += f' {prop}="{self.props[prop]}"'
-        return html
+        return props_to_html(self.props)
 
     def __repr__(self):
         return f"HTMLNode(tag={self.tag}, value={self.value}, children={self.children}, props={self.props})"
@@ -25,3 +54,59 @@ class HTMLNode:
                 self.children == other.children and
                 self.props == other.props)
 
+
+# Attributes of props, with their values escaped for a quoted attribute.
+def render_props(props):
+    return "".join([f' {name}="{escape(str(value))}"' for name, value in props.items()])
+
+# LRU memo of the attributes of props_to_html by the props they were rendered
+# from, as the same hrefs and srcs repeat all over a site.  Bounded by the
+# number of prop sets it holds, attributes longer than max_length (e.g. data
+# URIs) are not cached.
+class PropsCache:
+
+    def __init__(self, max_entries=4096, max_length=1024):
+        self.max_entries = max_entries
+        self.max_length = max_length
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, props):
+        key = tuple(props.items())
+        try:
+            html = self.entries.get(key)
+        except TypeError:
+            # an unhashable value
+            return render_props(props)
+        if html is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return html
+        self.misses += 1
+        html = render_props(props)
+        # Only string values are cached, others like 1, 1.0 and True compare
+        # equal but render differently.  Strings never equal them, so hits
+        # are only found for prop sets of strings.
+        if len(html) <= self.max_length and all(type(v) is str for v in props.values()):
+            self.entries[key] = html
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return html
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+        }
+
+props_cache = PropsCache()
+
+def props_to_html(props):
+    if not props:
+        return ""
+    return props_cache.get(props)
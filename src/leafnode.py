@@ -2,6 +2,8 @@ from htmlnode import HTMLNode
 
 class LeafNode(HTMLNode):
 
+    __slots__ = ()
+
     def __init__(self, tag, value, props = None):
         super().__init__(tag, value, None, props)
 
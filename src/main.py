@@ -1,10 +1,441 @@
-from textnode import TextNode
+import argparse
+import cProfile
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from blockcache import BlockCache, open_block_cache
+from blocks import iter_buffer_blocks, markdown_to_blocks
+from htmlnode import props_cache
+from conversion import (
+    RENDERER_VERSION, InlineCache, blocks_to_html_node, extract_title, using_inline_cache,
+)
+from profiler import Profiler, format_report
+
+MANIFEST = ".manifest.json"
+
+# Outputs that get a precompressed .gz sibling with --gzip.
+COMPRESSIBLE = {".html", ".css", ".js", ".json", ".svg", ".txt", ".xml"}
+
+
+def find_pages(content_dir):
+    pages = []
+    for root, dirs, files in os.walk(content_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith(".md"):
+                pages.append(os.path.relpath(os.path.join(root, name), content_dir))
+    return pages
+
+def page_dest(page, dest_dir):
+    return os.path.join(dest_dir, os.path.splitext(page)[0] + ".html")
+
+def read_text(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+# Pages from this size on are memory-mapped and rendered a block at a time.
+LARGE_PAGE = 16 << 20
+
+def generate_page(page, content_dir, dest_dir, template, block_cache=None):
+    dest = page_dest(page, dest_dir)
+    os.replace(render_page(page, content_dir, dest, template, block_cache), dest)
+    return dest
+
+# Renders page to dest + ".tmp", which it returns, so dest is only replaced
+# by a complete page.
+def render_page(page, content_dir, dest, template, block_cache=None):
+    src = os.path.join(content_dir, page)
+    tmp = dest + ".tmp"
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    try:
+        if os.path.getsize(src) >= LARGE_PAGE:
+            render_large_page(src, tmp, template, block_cache)
+            return tmp
+        blocks = markdown_to_blocks(read_text(src))
+        try:
+            title = extract_title(blocks)
+            node = blocks_to_html_node(blocks, block_cache)
+        except ValueError as e:
+            raise ValueError(f"{src}: {e}") from e
+        head, tail = template.split("{{ Content }}", 1)
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(head.replace("{{ Title }}", title))
+            node.write_html(f)
+            f.write(tail.replace("{{ Title }}", title))
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return tmp
+
+# render_page for a page that shouldn't be read into memory.  The blocks are
+# scanned once for the title and once more while rendering.
+def render_large_page(src, path, template, block_cache=None):
+    head, tail = template.split("{{ Content }}", 1)
+    with open(src, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        try:
+            title = extract_title(iter_buffer_blocks(buf))
+            node = blocks_to_html_node(iter_buffer_blocks(buf), block_cache, lazy=True)
+            with open(path, "w", encoding="utf-8") as out:
+                out.write(head.replace("{{ Title }}", title))
+                node.write_html(out)
+                out.write(tail.replace("{{ Title }}", title))
+        except ValueError as e:
+            raise ValueError(f"{src}: {e}") from e
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def compress_file(path):
+    # wbits=31 writes a gzip container with a zero timestamp, so unchanged
+    # input gives the same .gz
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 31)
+    with open(path, "rb") as src, open(path + ".gz.tmp", "wb") as dest:
+        for chunk in iter(lambda: src.read(1 << 16), b""):
+            dest.write(compressor.compress(chunk))
+        dest.write(compressor.flush())
+    os.replace(path + ".gz.tmp", path + ".gz")
+
+# Stages of a build outside of the markdown -> HTML path, see profiler.py.
+PAGE_HOOKS = [
+    (sys.modules[__name__], "read_text", "read", "chars read"),
+    (sys.modules[__name__], "markdown_to_blocks", "split", "blocks"),
+    (sys.modules[__name__], "file_hash", "hash", None),
+    (sys.modules[__name__], "compress_file", "compress", None),
+]
+
+_inline_caches = {}
+
+# The inline cache of that size for the pages this process builds.
+def page_inline_cache(max_size):
+    if max_size not in _inline_caches:
+        _inline_caches[max_size] = InlineCache(max_size)
+    return _inline_caches[max_size]
+
+# With profile, returns the output hash and the page's profile stats.  With
+# inline_cache, inline HTML is memoized in a cache of that size, one per
+# worker process, which is only in use while a page is built.  With
+# block_cache, the HTML of blocks is taken from and added to the BlockCache
+# database at that path.
+def build_page(
+    page, old_output, content_dir, dest_dir, template, gzip=False, profile=False,
+    inline_cache=None, block_cache=None, block_cache_size=256 << 20,
+):
+    caches = {"props cache": props_cache}
+    if inline_cache:
+        caches["inline cache"] = page_inline_cache(inline_cache)
+    if block_cache:
+        caches["block cache"] = open_block_cache(block_cache, block_cache_size)
+    args = (page, old_output, content_dir, dest_dir, template, gzip, caches.get("block cache"))
+    with using_inline_cache(caches.get("inline cache")):
+        if not profile:
+            return write_page(*args)
+        before = {name: cache.stats() for name, cache in caches.items()}
+        with Profiler().install(PAGE_HOOKS).install() as profiler:
+            start = time.perf_counter()
+            output = write_page(*args)
+            seconds = time.perf_counter() - start
+    stats = profiler.stats(seconds)
+    for name, cache in caches.items():
+        for counter, n in cache.stats().items():
+            if counter in ["hits", "misses", "evictions"]:
+                stats["counters"][f"{name} {counter}"] = n - before[name][counter]
+    return output, stats
+
+# An output with the same bytes as before is left alone, so it keeps its
+# mtime, which its .gz has to be as new as to be served, and its ETag.
+def write_page(page, old_output, content_dir, dest_dir, template, gzip=False, block_cache=None):
+    dest = page_dest(page, dest_dir)
+    tmp = render_page(page, content_dir, dest, template, block_cache)
+    if block_cache is not None:
+        block_cache.flush()
+    output = file_hash(tmp)
+    try:
+        unchanged = output == old_output and os.path.getsize(dest) == os.path.getsize(tmp)
+    except FileNotFoundError:
+        unchanged = False
+    if unchanged:
+        os.remove(tmp)
+    else:
+        os.replace(tmp, dest)
+    if gzip:
+        if not unchanged or not os.path.exists(dest + ".gz"):
+            compress_file(dest)
+    elif os.path.exists(dest + ".gz"):
+        # would be stale
+        os.remove(dest + ".gz")
+    return output
+
+def load_manifest(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != RENDERER_VERSION:
+        return None
+    return manifest
+
+def save_manifest(path, manifest):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+def remove_output(path, dest_dir):
+    for path in [path + ".gz", path]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    path = os.path.dirname(path)
+    while os.path.abspath(path) != os.path.abspath(dest_dir) and not os.listdir(path):
+        os.rmdir(path)
+        path = os.path.dirname(path)
+
+def copy_if_changed(src, dest, gzip=False):
+    compress = gzip and os.path.splitext(dest)[1] in COMPRESSIBLE
+    try:
+        s, d = os.stat(src), os.stat(dest)
+        if s.st_size == d.st_size and s.st_mtime_ns == d.st_mtime_ns:
+            if compress and not os.path.exists(dest + ".gz"):
+                compress_file(dest)
+            return dest
+    except FileNotFoundError:
+        pass
+    shutil.copy2(src, dest)
+    if compress:
+        compress_file(dest)
+    return dest
+
+def render_pages(build, pages, jobs, *args):
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(pages) < 2:
+        return list(map(build, pages, *args))
+    # Pages are independent, so they are handed out in chunks to amortize the
+    # pickling, and results come back in page order.
+    chunksize = max(1, len(pages) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(build, pages, *args, chunksize=chunksize))
+
+# Renders the pages whose source, the template or the renderer changed since
+# the build recorded in the manifest, removes the output of deleted pages and
+# static files and returns the paths of the pages written.  Given a profile
+# dict, the profile stats of each page written are stored in it.  See
+# build_page for the caches.
+def generate_site(
+    content_dir, template_path, dest_dir, static_dir=None, jobs=None, force=False, gzip=False,
+    profile=None, inline_cache=None, block_cache=None, block_cache_size=256 << 20,
+):
+    # outputs copied from static_dir, relative to dest_dir
+    static = set()
+    if static_dir and os.path.isdir(static_dir):
+        def copy(src, dest):
+            static.add(os.path.relpath(dest, dest_dir))
+            return copy_if_changed(src, dest, gzip)
+        shutil.copytree(static_dir, dest_dir, dirs_exist_ok=True, copy_function=copy)
+    with open(template_path, encoding="utf-8") as f:
+        template = f.read()
+    template_hash = hashlib.sha256(template.encode("utf-8")).hexdigest()
+    manifest_path = os.path.join(dest_dir, MANIFEST)
+    manifest = load_manifest(manifest_path)
+    known_pages = manifest["pages"] if manifest else {}
+    if manifest and manifest["template"] == template_hash and not force:
+        old_pages = known_pages
+    else:
+        old_pages = {}
+
+    pages = {}
+    dirty = []
+    for page in find_pages(content_dir):
+        st = os.stat(os.path.join(content_dir, page))
+        entry = old_pages.get(page)
+        if entry and entry["mtime"] == st.st_mtime_ns and entry["size"] == st.st_size:
+            source = entry["source"]
+        else:
+            source = file_hash(os.path.join(content_dir, page))
+        dest = page_dest(page, dest_dir)
+        if not (entry and entry["source"] == source and os.path.exists(dest)):
+            # the hash of what's in dest, even when forced, so write_page can
+            # tell whether the output changed
+            entry = {"output": known_pages.get(page, {}).get("output")}
+            dirty.append(page)
+        elif gzip and not os.path.exists(dest + ".gz"):
+            compress_file(dest)
+        pages[page] = dict(entry, mtime=st.st_mtime_ns, size=st.st_size, source=source)
+    # a deleted page or static file may have been replaced by the other kind
+    outputs = {os.path.relpath(page_dest(page, dest_dir), dest_dir) for page in pages}
+    for page in known_pages.keys() - pages.keys():
+        if os.path.relpath(page_dest(page, dest_dir), dest_dir) not in static:
+            remove_output(page_dest(page, dest_dir), dest_dir)
+    known_static = set(manifest.get("static", [])) if manifest else set()
+    for path in known_static - static - outputs:
+        remove_output(os.path.join(dest_dir, path), dest_dir)
+
+    build = partial(build_page, content_dir=content_dir, dest_dir=dest_dir, template=template,
+                    gzip=gzip, profile=profile is not None, inline_cache=inline_cache,
+                    block_cache=block_cache, block_cache_size=block_cache_size)
+    if block_cache and dirty:
+        # creates the database or empties it after a renderer change before
+        # the workers open it
+        BlockCache(block_cache, block_cache_size).close()
+    old_outputs = [pages[page]["output"] for page in dirty]
+    for page, output in zip(dirty, render_pages(build, dirty, jobs, old_outputs)):
+        if profile is not None:
+            output, profile[page] = output
+        pages[page]["output"] = output
+    if block_cache and dirty:
+        with BlockCache(block_cache, block_cache_size) as cache:
+            cache.evict()
+    os.makedirs(dest_dir, exist_ok=True)
+    save_manifest(manifest_path, {
+        "version": RENDERER_VERSION,
+        "template": template_hash,
+        "pages": pages,
+        "static": sorted(static),
+    })
+    return [page_dest(page, dest_dir) for page in dirty]
+
+# (mtime, size) of every file below the given files and directories.
+def snapshot(paths):
+    state = {}
+    for path in paths:
+        if not path:
+            continue
+        if os.path.isfile(path):
+            st = os.stat(path)
+            state[path] = (st.st_mtime_ns, st.st_size)
+        for root, dirs, files in os.walk(path):
+            for name in files:
+                try:
+                    st = os.stat(os.path.join(root, name))
+                except FileNotFoundError:
+                    continue
+                state[os.path.join(root, name)] = (st.st_mtime_ns, st.st_size)
+    return state
+
+# Polls until something changed and then until nothing changed for debounce
+# seconds, so a burst of saves results in one rebuild.
+def wait_for_changes(paths, state, interval=0.1, debounce=0.2):
+    while (current := snapshot(paths)) == state:
+        time.sleep(interval)
+    while True:
+        time.sleep(debounce)
+        latest = snapshot(paths)
+        if latest == current:
+            return current
+        current = latest
+
+# caches are the cache arguments of generate_site.
+def watch_site(
+    content_dir, template_path, dest_dir, static_dir=None, jobs=None, gzip=False, **caches
+):
+    paths = [content_dir, template_path, static_dir]
+    state = snapshot(paths)
+    while True:
+        state = wait_for_changes(paths, state)
+        start = time.perf_counter()
+        try:
+            pages = generate_site(
+                content_dir, template_path, dest_dir, static_dir, jobs, gzip=gzip, **caches
+            )
+        except (OSError, ValueError) as e:
+            print(f"Build failed: {e}")
+            continue
+        print(f"Regenerated {len(pages)} pages in {time.perf_counter() - start:.3f}s")
+
 
 def main():
-    tn = TextNode("", "bold")
-    print(tn)
-    tn = TextNode("This is a text node", "bold", "https://www.boot.dev")
-    print(tn)
+    parser = argparse.ArgumentParser(description="Static site generator")
+    parser.add_argument(
+        "--content", type=str, help="Directory with the markdown pages", default="content"
+    )
+    parser.add_argument(
+        "--template", type=str, help="HTML template of a page", default="template.html"
+    )
+    parser.add_argument(
+        "--static", type=str, help="Directory with static files", default="static"
+    )
+    parser.add_argument("--dest", type=str, help="Output directory", default="public")
+    parser.add_argument(
+        "--jobs", type=int, help="Number of worker processes", default=os.cpu_count()
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Render all pages, not only changed ones"
+    )
+    parser.add_argument(
+        "--gzip", action="store_true", help="Write precompressed .gz files next to the output"
+    )
+    parser.add_argument(
+        "--watch", action="store_true", help="Rebuild changed pages until interrupted"
+    )
+    parser.add_argument(
+        "--inline-cache", type=int, metavar="MB",
+        help="Memoize the HTML of repeated inline text in a cache of this size per process",
+    )
+    parser.add_argument(
+        "--block-cache", type=str, metavar="PATH", default=".cache/blocks.db",
+        help="Database with the HTML of blocks rendered by earlier builds, '' for none",
+    )
+    parser.add_argument(
+        "--block-cache-size", type=int, metavar="MB", default=256,
+        help="Size of the block cache, least recently used blocks are evicted",
+    )
+    parser.add_argument(
+        "--profile", action="store_true", help="Print the time spent per stage and page"
+    )
+    parser.add_argument(
+        "--profile-top", type=int, help="Number of slowest pages to list", default=10
+    )
+    parser.add_argument(
+        "--profile-dump", type=str, help="Write cProfile stats of a serial build to this file"
+    )
+    args = parser.parse_args()
+
+    profile = {} if args.profile else None
+    caches = {
+        "inline_cache": args.inline_cache and args.inline_cache << 20,
+        "block_cache": args.block_cache,
+        "block_cache_size": args.block_cache_size << 20,
+    }
+    if args.profile_dump:
+        # cProfile only sees the current process
+        profiler = cProfile.Profile()
+        pages = profiler.runcall(
+            generate_site,
+            args.content, args.template, args.dest, args.static, 1, args.force, args.gzip, profile,
+            **caches,
+        )
+        profiler.dump_stats(args.profile_dump)
+    else:
+        pages = generate_site(
+            args.content, args.template, args.dest, args.static, args.jobs, args.force, args.gzip,
+            profile, **caches,
+        )
+    print(f"Generated {len(pages)} pages in '{args.dest}'")
+    if profile is not None:
+        print(format_report(profile, args.profile_top))
+    if args.watch:
+        print(f"Watching '{args.content}', '{args.template}' and '{args.static}'...")
+        try:
+            watch_site(
+                args.content, args.template, args.dest, args.static, args.jobs, args.gzip, **caches
+            )
+        except KeyboardInterrupt:
+            pass
 
-main()
 
+if __name__ == "__main__":
+    main()
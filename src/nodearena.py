@@ -0,0 +1,250 @@
+from array import array
+
+from blocks import BlockType, block_to_block_type, markdown_to_blocks
+from conversion import inline_rules, text_to_textnodes
+from htmlnode import props_to_html
+from leafnode import LeafNode
+from parentnode import ParentNode
+from textnode import TextType
+
+NONE = -1
+
+_LEAF   = 0
+_PARENT = 1
+
+# A document tree stored as parallel arrays indexed by node number instead of
+# one object per node.  Tags, values and prop sets are interned, so a node
+# costs a few machine integers and repeated strings are kept once.
+class NodeArena:
+
+    def __init__(self):
+        self.kinds = array("b")
+        self.tags = array("i")
+        self.values = array("i")
+        self.props = array("i")
+        self.parents = array("i")
+        self.first_child = array("i")
+        self.last_child = array("i")
+        self.next_sibling = array("i")
+        self.strings = []
+        self.string_ids = {}
+        self.prop_sets = []
+        self.prop_set_ids = {}
+        self.start_tags = {}
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def intern(self, string):
+        if string is None:
+            return NONE
+        # other values by type too, 1, 1.0 and True are equal but render
+        # differently
+        key = string if type(string) is str else (type(string), string)
+        i = self.string_ids.get(key)
+        if i is None:
+            i = self.string_ids[key] = len(self.strings)
+            self.strings.append(string)
+        return i
+
+    def intern_props(self, props):
+        if props is None:
+            return NONE
+        key = tuple((self.intern(k), self.intern(v)) for k, v in props.items())
+        i = self.prop_set_ids.get(key)
+        if i is None:
+            i = self.prop_set_ids[key] = len(self.prop_sets)
+            self.prop_sets.append(key)
+        return i
+
+    def string(self, i):
+        return None if i == NONE else self.strings[i]
+
+    def props_dict(self, i):
+        if i == NONE:
+            return None
+        return {self.strings[k]: self.strings[v] for k, v in self.prop_sets[i]}
+
+    def _add(self, parent, kind, tag, value, props):
+        node = len(self.kinds)
+        self.kinds.append(kind)
+        self.tags.append(self.intern(tag))
+        self.values.append(self.intern(value))
+        self.props.append(self.intern_props(props))
+        self.parents.append(parent)
+        self.first_child.append(NONE)
+        self.last_child.append(NONE)
+        self.next_sibling.append(NONE)
+        if parent != NONE:
+            last = self.last_child[parent]
+            if last == NONE:
+                self.first_child[parent] = node
+            else:
+                self.next_sibling[last] = node
+            self.last_child[parent] = node
+        return node
+
+    def add_leaf(self, parent, tag, value, props = None):
+        return self._add(parent, _LEAF, tag, value, props)
+
+    def add_parent(self, parent, tag, props = None):
+        if tag is None:
+            raise ValueError("missing tag")
+        return self._add(parent, _PARENT, tag, None, props)
+
+    # Same leaf as conversion.text_node_to_html_node, without the LeafNode.
+    def add_text_node(self, parent, text_node):
+        match text_node.text_type:
+            case TextType.TEXT:
+                return self.add_leaf(parent, None, text_node.text)
+            case TextType.BOLD:
+                return self.add_leaf(parent, "b", text_node.text)
+            case TextType.ITALIC:
+                return self.add_leaf(parent, "i", text_node.text)
+            case TextType.CODE:
+                return self.add_leaf(parent, "code", text_node.text)
+            case TextType.LINK:
+                return self.add_leaf(parent, "a", text_node.text, {"href": text_node.url})
+            case TextType.IMAGE:
+                return self.add_leaf(parent, "img", "", {"src": text_node.url, "alt": text_node.text})
+        if text_node.text_type in inline_rules.tags:
+            return self.add_leaf(parent, inline_rules.tags[text_node.text_type], text_node.text)
+        raise ValueError(f"unknown text type '{text_node.text_type}'")
+
+    # Same leaves as conversion.text_to_children, without the inline cache.
+    def add_text(self, parent, text):
+        for text_node in text_to_textnodes(text):
+            self.add_text_node(parent, text_node)
+
+    # Same nodes as conversion.block_to_html_node, returns the block's node.
+    def add_block(self, parent, block, block_type = None):
+        if block_type is None:
+            block_type = block_to_block_type(block)
+        match block_type:
+            case BlockType.HEADING:
+                level = len(block) - len(block.lstrip("#"))
+                node = self.add_parent(parent, f"h{level}")
+                self.add_text(node, block[level + 1:])
+            case BlockType.CODE:
+                node = self.add_parent(parent, "pre")
+                self.add_leaf(node, "code", block[3:-3].strip("\n"))
+            case BlockType.QUOTE:
+                node = self.add_parent(parent, "blockquote")
+                self.add_text(node, "\n".join(line[2:] for line in block.split("\n")))
+            case BlockType.UNORDERED_LIST | BlockType.ORDERED_LIST:
+                tag, marker = ("ul", 2) if block_type == BlockType.UNORDERED_LIST else ("ol", 3)
+                node = self.add_parent(parent, tag)
+                for line in block.split("\n"):
+                    self.add_text(self.add_parent(node, "li"), line[marker:])
+            case _:
+                node = self.add_parent(parent, "p")
+                self.add_text(node, block.replace("\n", " "))
+        return node
+
+    # Same nodes as conversion.markdown_to_html_node, returns the root's.
+    def add_markdown(self, parent, markdown):
+        root = self.add_parent(parent, "div")
+        for block in markdown_to_blocks(markdown):
+            self.add_block(root, block)
+        return root
+
+    # Copies an HTMLNode tree below parent and returns the index of its root.
+    def add_node(self, parent, node):
+        root = NONE
+        stack = [(parent, node)]
+        while stack:
+            parent, node = stack.pop()
+            if isinstance(node, ParentNode):
+                if node.children is None:
+                    raise ValueError("missing child nodes")
+                i = self.add_parent(parent, node.tag, node.props)
+                stack.extend((i, child) for child in reversed(node.children))
+            else:
+                i = self.add_leaf(parent, node.tag, node.value, node.props)
+            if root == NONE:
+                root = i
+        return root
+
+    @classmethod
+    def from_node(cls, node):
+        arena = cls()
+        arena.add_node(NONE, node)
+        return arena
+
+    # Builds the tree of markdown_to_html_node without making its nodes.
+    @classmethod
+    def from_markdown(cls, markdown):
+        arena = cls()
+        arena.add_markdown(NONE, markdown)
+        return arena
+
+    def children(self, node):
+        child = self.first_child[node]
+        while child != NONE:
+            yield child
+            child = self.next_sibling[child]
+
+    def to_node(self, root = 0):
+        nodes = {}
+        for node in self.subtree(root):
+            tag = self.string(self.tags[node])
+            props = self.props_dict(self.props[node])
+            if self.kinds[node] == _PARENT:
+                nodes[node] = ParentNode(tag, [], props)
+            else:
+                nodes[node] = LeafNode(tag, self.string(self.values[node]), props)
+            if node != root:
+                nodes[self.parents[node]].children.append(nodes[node])
+        return nodes[root]
+
+    # Node numbers of the subtree in document order.
+    def subtree(self, root = 0):
+        node = root
+        while True:
+            yield node
+            child = self.first_child[node]
+            if child != NONE:
+                node = child
+                continue
+            while node != root and self.next_sibling[node] == NONE:
+                node = self.parents[node]
+            if node == root:
+                return
+            node = self.next_sibling[node]
+
+    def start_tag(self, node):
+        key = (self.tags[node], self.props[node])
+        html = self.start_tags.get(key)
+        if html is None:
+            html = self.start_tags[key] = (
+                f"<{self.strings[key[0]]}{props_to_html(self.props_dict(key[1]))}>"
+            )
+        return html
+
+    def to_html_fragments(self, root = 0):
+        kinds, tags, values = self.kinds, self.tags, self.values
+        first_child, next_sibling, parents = self.first_child, self.next_sibling, self.parents
+        strings = self.strings
+        node = root
+        while True:
+            if kinds[node] == _PARENT:
+                yield self.start_tag(node)
+                child = first_child[node]
+                if child != NONE:
+                    node = child
+                    continue
+                yield f"</{strings[tags[node]]}>"
+            elif tags[node] == NONE or not strings[tags[node]]:
+                yield self.string(values[node])
+            else:
+                tag = strings[tags[node]]
+                yield f"{self.start_tag(node)}{self.string(values[node])}</{tag}>"
+            while node != root and next_sibling[node] == NONE:
+                node = parents[node]
+                yield f"</{strings[tags[node]]}>"
+            if node == root:
+                return
+            node = next_sibling[node]
+
+    def to_html(self, root = 0):
+        return "".join(self.to_html_fragments(root))
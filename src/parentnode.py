@@ -2,17 +2,34 @@ from htmlnode import HTMLNode
 
 class ParentNode(HTMLNode):
 
+    __slots__ = ()
+
     def __init__(self, tag, children, props = None):
         super().__init__(tag, None, children, props)
 
-    def to_html(self):
+    def start_tag(self):
         if self.tag is None:
             raise ValueError("missing tag")
         if self.children is None:
             raise ValueError("missing child nodes")
-        html = f"<{self.tag}{self.props_to_html()}>"
-        for child in self.children:
-            html += child.to_html()
-        html += f"</{self.tag}>"
-        return html
+        return f"<{self.tag}{self.props_to_html()}>"
+
+    def to_html(self):
+        return "".join(self.to_html_fragments())
 
+    def to_html_fragments(self):
+        # Walk the tree with an explicit stack of child iterators, so neither
+        # depth nor width is a problem.
+        yield self.start_tag()
+        stack = [(self, iter(self.children))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if isinstance(child, ParentNode):
+                    yield child.start_tag()
+                    stack.append((child, iter(child.children)))
+                    break
+                yield child.to_html()
+            else:
+                stack.pop()
+                yield f"</{node.tag}>"
@@ -0,0 +1,132 @@
+import functools
+import time
+
+import blocks
+import conversion
+import htmlnode
+import parentnode
+
+# Functions timed as a stage of the markdown -> HTML path, as
+# (namespace, name, stage, counter).  A function imported into another module
+# is hooked in both, as that module looks it up in its own globals.  Counters
+# add up len() of the function's result.
+STAGE_HOOKS = [
+    (blocks, "markdown_to_blocks", "split", "blocks"),
+    (blocks, "block_to_block_type", "classify", None),
+    (conversion, "markdown_to_blocks", "split", "blocks"),
+    (conversion, "block_to_block_type", "classify", None),
+    (conversion, "text_to_textnodes", "inline", "text nodes"),
+    (conversion, "block_to_html_node", "convert", None),
+    (conversion, "_block_html", "convert", None),
+    (parentnode.ParentNode, "to_html", "serialize", "html chars"),
+    (htmlnode.HTMLNode, "write_html", "serialize", None),
+    (htmlnode.HTMLNode, "_write_chunk", "write", None),
+]
+
+# Times the stages of a build by wrapping the functions that implement them
+# while installed, so a build without a profiler runs the plain functions.
+# The time of a stage excludes the stages nested in it, e.g. inline parsing
+# inside of convert.
+class Profiler:
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.nested = []
+        self.hooks = []
+
+    def hook(self, namespace, name, stage, counter=None):
+        original = vars(namespace)[name]
+        func = original
+        if isinstance(original, staticmethod):
+            func = original.__func__
+        stats = self.stages.setdefault(stage, [0.0, 0])
+        nested = self.nested
+        counters = self.counters
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            nested.append(0.0)
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                stats[0] += elapsed - nested.pop()
+                stats[1] += 1
+                if nested:
+                    nested[-1] += elapsed
+            if counter:
+                counters[counter] = counters.get(counter, 0) + len(result)
+            return result
+
+        setattr(namespace, name, staticmethod(timed) if func is not original else timed)
+        self.hooks.append((namespace, name, original))
+
+    def install(self, hooks=STAGE_HOOKS):
+        for hook in hooks:
+            self.hook(*hook)
+        return self
+
+    def remove(self):
+        while self.hooks:
+            namespace, name, original = self.hooks.pop()
+            setattr(namespace, name, original)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.remove()
+
+    # Plain data, so it can be returned from a worker process.
+    def stats(self, seconds):
+        return {
+            "seconds": seconds,
+            "stages": {stage: list(s) for stage, s in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+
+def merge_stats(stats):
+    total = {"seconds": 0.0, "stages": {}, "counters": {}}
+    for s in stats:
+        total["seconds"] += s["seconds"]
+        for stage, (seconds, calls) in s["stages"].items():
+            t = total["stages"].setdefault(stage, [0.0, 0])
+            t[0] += seconds
+            t[1] += calls
+        for counter, n in s["counters"].items():
+            total["counters"][counter] = total["counters"].get(counter, 0) + n
+    return total
+
+# Per-stage totals over all pages, followed by the per-stage breakdown of the
+# slowest pages.  Time outside of any stage is reported as "other".
+def format_report(pages, top=10):
+    total = merge_stats(pages.values())
+    stages = list(total["stages"])
+    seconds = total["seconds"] or 1e-9
+    lines = [f"{'stage':16} {'seconds':>9} {'share':>6} {'calls':>9}"]
+    for stage in stages + ["other"]:
+        if stage == "other":
+            s, calls = other(total), ""
+        else:
+            s, calls = total["stages"][stage]
+        lines.append(f"{stage:16} {s:9.3f} {s / seconds:6.1%} {calls:>9}")
+    lines.append(f"{'total':16} {total['seconds']:9.3f} in {len(pages)} pages")
+    for counter, n in total["counters"].items():
+        lines.append(f"{counter:16} {n:9}")
+
+    slowest = sorted(pages, key=lambda page: pages[page]["seconds"], reverse=True)[:top]
+    if slowest:
+        lines.append("")
+        lines.append(f"slowest {len(slowest)} pages (ms)")
+        lines.append(" ".join(f"{stage:>9}" for stage in stages + ["other", "total"]) + "  page")
+        for page in slowest:
+            s = pages[page]
+            row = [s["stages"].get(stage, [0.0])[0] for stage in stages]
+            row += [other(s), s["seconds"]]
+            lines.append(" ".join(f"{x * 1e3:9.2f}" for x in row) + f"  {page}")
+    return "\n".join(lines)
+
+def other(stats):
+    return stats["seconds"] - sum(s for s, _ in stats["stages"].values())
@@ -0,0 +1,111 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import blockcache
+from blockcache import BlockCache, open_block_cache
+from conversion import blocks_to_html_node
+from blocks import markdown_to_blocks
+
+markdown = "# Title\n\nSome **bold** text\n\n- a *list*\n- of `code`\n\n```\ncode\n```"
+
+class TestBlockCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cache", "blocks.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_get_put(self):
+        with BlockCache(self.path) as cache:
+            self.assertIsNone(cache.get("block"))
+            cache.put("block", "<p>block</p>")
+            cache.flush()
+            self.assertEqual(cache.get("block"), "<p>block</p>")
+            self.assertEqual(cache.stats(), {"hits": 1, "misses": 1})
+            self.assertEqual(cache.size(), 12)
+
+    def test_persistent(self):
+        with BlockCache(self.path) as cache:
+            cache.put("block", "<p>block</p>")
+        with BlockCache(self.path) as cache:
+            self.assertEqual(cache.get("block"), "<p>block</p>")
+
+    def test_renderer_version(self):
+        with BlockCache(self.path) as cache:
+            cache.put("block", "<p>block</p>")
+        with mock.patch.object(blockcache, "RENDERER_VERSION", -1):
+            with BlockCache(self.path) as cache:
+                self.assertIsNone(cache.get("block"))
+
+    def test_evict(self):
+        with BlockCache(self.path, max_size=30) as cache:
+            for i, block in enumerate(["one", "two", "three"]):
+                cache.put(block, "x" * 10)
+                cache.flush()
+                cache.db.execute("UPDATE blocks SET used = ? WHERE key = ?",
+                                 (i, cache.key(block)))
+            # a hit makes "one" the most recently used
+            self.assertEqual(cache.get("one"), "x" * 10)
+            cache.put("four", "x" * 15)
+            self.assertEqual(cache.evict(), 2)
+            self.assertIsNone(cache.get("two"))
+            self.assertIsNone(cache.get("three"))
+            self.assertEqual(cache.get("one"), "x" * 10)
+            self.assertEqual(cache.get("four"), "x" * 15)
+            self.assertEqual(cache.evict(), 0)
+
+    def test_recently_used_not_touched(self):
+        with BlockCache(self.path) as cache:
+            cache.put("block", "<p>block</p>")
+            cache.flush()
+            cache.get("block")
+            self.assertEqual(cache.used, [])
+
+    def test_corrupt(self):
+        os.makedirs(os.path.dirname(self.path))
+        for suffix in ["", "-wal", "-shm"]:
+            with open(self.path + suffix, "wb") as f:
+                f.write(b"not a database" * 100)
+        with BlockCache(self.path) as cache:
+            self.assertIsNone(cache.get("block"))
+            cache.put("block", "<p>block</p>")
+        with BlockCache(self.path) as cache:
+            self.assertEqual(cache.get("block"), "<p>block</p>")
+
+    def test_locked(self):
+        with BlockCache(self.path) as cache:
+            cache.put("block", "<p>block</p>")
+        db = sqlite3.connect(self.path, isolation_level=None)
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            with mock.patch.object(BlockCache, "timeout", 0.1):
+                with self.assertRaises(sqlite3.OperationalError):
+                    BlockCache(self.path)
+        finally:
+            db.close()
+        with BlockCache(self.path) as cache:
+            self.assertEqual(cache.get("block"), "<p>block</p>")
+
+    def test_open_block_cache(self):
+        cache = open_block_cache(self.path)
+        self.assertIs(open_block_cache(self.path), cache)
+        cache.close()
+        del blockcache._caches[(os.getpid(), os.path.abspath(self.path), cache.max_size)]
+
+    def test_blocks_to_html_node(self):
+        blocks = markdown_to_blocks(markdown)
+        html = blocks_to_html_node(blocks).to_html()
+        with BlockCache(self.path) as cache:
+            self.assertEqual(blocks_to_html_node(blocks, cache).to_html(), html)
+            cache.flush()
+            self.assertEqual(blocks_to_html_node(blocks, cache).to_html(), html)
+            self.assertEqual(cache.stats(), {"hits": 4, "misses": 4})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,30 @@
+import io
+import mmap
+import os
+import tempfile
 import unittest
 
 from blocks import (
+    BlockSpan,
     BlockType,
     block_to_block_type,
+    iter_buffer_blocks,
+    iter_markdown_blocks,
     markdown_to_blocks,
+    markdown_to_spans,
 )
 
+markdown = """
+# This is a heading
+
+This is a paragraph of text.   
+   It has some **bold** and *italic* words inside of it.
+
+
+* This is the first list item in a list block
+* This is a list item
+"""
+
 class TestMarkdown(unittest.TestCase):
 
     def test_empty(self):
@@ -35,6 +54,116 @@ This is a paragraph of text. It has some **bold** and *italic* words inside of i
 * This is another list item""",
 ])
 
+class TestIterBlocks(unittest.TestCase):
+
+    def test_empty(self):
+        self.assertEqual(list(iter_markdown_blocks(io.StringIO(""))), [])
+
+    def test_stream(self):
+        self.assertEqual(list(iter_markdown_blocks(io.StringIO(markdown))),
+                         markdown_to_blocks(markdown))
+
+    def test_lazy(self):
+        lines = iter(["first", "", "second", "", "third"])
+        blocks = iter_markdown_blocks(lines)
+        self.assertEqual(next(blocks), "first")
+        self.assertEqual(next(lines), "second")
+
+    def test_path(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "page.md")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(markdown)
+            self.assertEqual(list(iter_markdown_blocks(path)), markdown_to_blocks(markdown))
+
+class TestBufferBlocks(unittest.TestCase):
+
+    # what markdown_to_blocks returns for the file read in text mode
+    def assertSameBlocks(self, data):
+        text = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8").read()
+        self.assertEqual(list(iter_buffer_blocks(data)), markdown_to_blocks(text))
+        self.assertEqual(list(iter_buffer_blocks(memoryview(data))), markdown_to_blocks(text))
+
+    def test_empty(self):
+        self.assertEqual(list(iter_buffer_blocks(b"")), [])
+        self.assertEqual(list(iter_buffer_blocks(b"\n \n")), [])
+
+    def test_blocks(self):
+        self.assertSameBlocks(markdown.encode("utf-8"))
+
+    def test_line_breaks(self):
+        self.assertSameBlocks(b"a\r\n\r\nb\r\nc")
+        self.assertSameBlocks(b"a\r\rb\rc\r")
+        self.assertSameBlocks(b"a\r\nb\n\r\n\rc")
+
+    def test_unicode_whitespace(self):
+        self.assertSameBlocks("a\n\u3000\nb\n\x85\t\nc \u2003".encode("utf-8"))
+        self.assertSameBlocks("\x1c\n\x1f\na\n\x0b\nb".encode("utf-8"))
+        self.assertSameBlocks("\ufeff# BOM\n\néè".encode("utf-8"))
+
+    def test_invalid_utf8(self):
+        with self.assertRaises(UnicodeDecodeError):
+            list(iter_buffer_blocks(b"a\n\n\xff"))
+
+    def test_mmap(self):
+        with tempfile.TemporaryFile() as f:
+            f.write(markdown.encode("utf-8") * 1000)
+            f.flush()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                blocks = list(iter_buffer_blocks(buf, release=mmap.PAGESIZE))
+        self.assertEqual(blocks, markdown_to_blocks(markdown * 1000))
+
+class TestBlockSpans(unittest.TestCase):
+
+    def test_empty(self):
+        self.assertEqual(markdown_to_spans(""), [])
+        self.assertEqual(markdown_to_spans(" \n\t\n"), [])
+
+    def test_spans(self):
+        text = "# Heading\n\nSome text\non two lines\n\n\n- a\n- b\n"
+        self.assertEqual(markdown_to_spans(text), [
+            BlockSpan(text, 0, 9, BlockType.HEADING),
+            BlockSpan(text, 11, 33, BlockType.PARAGRAPH),
+            BlockSpan(text, 36, 43, BlockType.UNORDERED_LIST),
+        ])
+        self.assertEqual(list(markdown_to_spans(text)[2].lines()), [(36, 39), (40, 43)])
+
+    def test_unclean(self):
+        spans = markdown_to_spans(markdown)
+        self.assertEqual([span.text() for span in spans], markdown_to_blocks(markdown))
+        self.assertEqual([span.clean for span in spans], [True, False, True])
+        self.assertEqual([span.block_type for span in spans], [
+            BlockType.HEADING, BlockType.PARAGRAPH, BlockType.UNORDERED_LIST,
+        ])
+
+    def test_unclean_type(self):
+        spans = markdown_to_spans("  > one  \n  > two")
+        self.assertEqual(spans[0].block_type, BlockType.QUOTE)
+        self.assertEqual(spans[0].text(), "> one\n> two")
+
+    def test_same_as_blocks(self):
+        texts = [
+            "", "a", "\n\na\n\n", "a\r\n\r\nb", "a \n b", "a\u3000\n\u3000\nb",
+            "```\ncode\n```", "1. a\n2. b\n\n> q", "# h\n\n#no heading",
+        ]
+        for text in texts:
+            spans = markdown_to_spans(text)
+            blocks = markdown_to_blocks(text)
+            self.assertEqual([span.text() for span in spans], blocks)
+            self.assertEqual([span.block_type for span in spans],
+                             [block_to_block_type(block) for block in blocks])
+
+    def test_position(self):
+        spans = markdown_to_spans("# Heading\n\n  text\n\n- a")
+        self.assertEqual([span.position() for span in spans], [(1, 1), (3, 3), (5, 1)])
+
+    def test_block_type_range(self):
+        text = "paragraph\n\n> quote\n> lines\n\n1. one"
+        self.assertEqual(block_to_block_type(text, 11, 26), BlockType.QUOTE)
+        self.assertEqual(block_to_block_type(text, 28), BlockType.ORDERED_LIST)
+        self.assertEqual(block_to_block_type(text, 0, 9), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("```a```b", 0, 7), BlockType.CODE)
+
 class TestBlockTypes(unittest.TestCase):
 
     def test_empty(self):
@@ -187,6 +316,20 @@ int main(int argc, char** argv)
 4. Drei"""
         self.assertEqual(block_to_block_type(block), BlockType.PARAGRAPH)
 
+    def test_ordered_list_nine(self):
+        block = "\n".join(f"{i}. Item" for i in range(1, 10))
+        self.assertEqual(block_to_block_type(block), BlockType.ORDERED_LIST)
+
+    def test_not_ordered_list_ten(self):
+        block = "\n".join(f"{i}. Item" for i in range(1, 11))
+        self.assertEqual(block_to_block_type(block), BlockType.PARAGRAPH)
+
+    def test_not_quote_empty_line(self):
+        block = """> Eins
+
+> Zwei"""
+        self.assertEqual(block_to_block_type(block), BlockType.PARAGRAPH)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -10,7 +10,17 @@ from conversion import (
     split_nodes_image,
     split_nodes_link,
     text_to_textnodes,
+    markdown_to_html_node,
+    extract_title,
+    InlineCache,
+    use_inline_cache,
+    spans_to_html_node,
+    markdown_to_html_many,
+    InlineRules,
+    inline_rules,
+    text_nodes_to_html,
 )
+from blocks import markdown_to_spans
 
 class TestTextNodeToHtmlNode(unittest.TestCase):
 
@@ -55,6 +65,34 @@ class TestTextNodeToHtmlNode(unittest.TestCase):
         leaf = LeafNode("img", "", {"src": "http://www.google.com/icon.png", "alt": "image description"})
         self.assertEqual(cv_text, leaf)
 
+    def test_strikethrough(self):
+        text = TextNode("This is struck", "strikethrough")
+        self.assertEqual(text_node_to_html_node(text), LeafNode("del", "This is struck"))
+
+
+class TestTextNodesToHtml(unittest.TestCase):
+
+    def test_same_as_leafs(self):
+        nodes = text_to_textnodes(
+            "a **b** *c* `d` ~~e~~ [f](https://g) ![h](https://i.png) <https://j>"
+        )
+        html = "".join(text_node_to_html_node(node).to_html() for node in nodes)
+        parts = ["<p>"]
+        self.assertIs(text_nodes_to_html(nodes, parts), parts)
+        self.assertEqual("".join(parts), "<p>" + html)
+
+    def test_escape(self):
+        nodes = text_to_textnodes('[a](/?b=1&c=2) ![say "hi"](/hi.png)')
+        html = "".join(text_node_to_html_node(node).to_html() for node in nodes)
+        self.assertEqual("".join(text_nodes_to_html(nodes, [])), html)
+        self.assertEqual(
+            html, '<a href="/?b=1&amp;c=2">a</a> <img src="/hi.png" alt="say &quot;hi&quot;"></img>'
+        )
+
+    def test_unknown_text_type(self):
+        with self.assertRaises(ValueError):
+            text_nodes_to_html([TextNode("some text", None)], [])
+
 class TestSplitNodesDelimiter(unittest.TestCase):
 
     def test_empty(self):
@@ -358,6 +396,348 @@ class TestTextToTextnodes(unittest.TestCase):
             TextNode("link", TextType.LINK, "https://boot.dev"),
         ])
 
+    def test_markdown_adjacent(self):
+        self.assertEqual(text_to_textnodes("**bold***italic*`code`"), [
+            TextNode("", TextType.TEXT),
+            TextNode("bold", TextType.BOLD),
+            TextNode("", TextType.TEXT),
+            TextNode("italic", TextType.ITALIC),
+            TextNode("", TextType.TEXT),
+            TextNode("code", TextType.CODE),
+            TextNode("", TextType.TEXT),
+        ])
+
+    def test_markdown_literal_delimiters(self):
+        self.assertEqual(text_to_textnodes("**a *b* `c`** and *d `e`*"), [
+            TextNode("", TextType.TEXT),
+            TextNode("a *b* `c`", TextType.BOLD),
+            TextNode(" and ", TextType.TEXT),
+            TextNode("d `e`", TextType.ITALIC),
+            TextNode("", TextType.TEXT),
+        ])
+
+    def test_markdown_emphasis_in_link(self):
+        text = "A [*boot* **dev**](https://boot.dev) *link*"
+        self.assertEqual(text_to_textnodes(text), [
+            TextNode("A ", TextType.TEXT),
+            TextNode("*boot* **dev**", TextType.LINK, "https://boot.dev"),
+            TextNode(" ", TextType.TEXT),
+            TextNode("link", TextType.ITALIC),
+            TextNode("", TextType.TEXT),
+        ])
+
+    def test_invalid(self):
+        for text in ["**bold", "*italic", "`code", "*a `b* c`", "**a [b](c)**"]:
+            with self.assertRaises(ValueError):
+                text_to_textnodes(text)
+
+    def test_brackets_in_links(self):
+        self.assertEqual(text_to_textnodes("[a[b](c) [d](e[f](g)"), [
+            TextNode("[a", TextType.TEXT),
+            TextNode("b", TextType.LINK, "c"),
+            TextNode(" ", TextType.TEXT),
+            TextNode("d", TextType.LINK, "e[f](g"),
+        ])
+        self.assertEqual(extract_markdown_links("[a[b](c)"), [("b", "c")])
+
+    def test_brackets_in_urls(self):
+        text = "[docs](https://api.x.com/items?filter[status]=open) ![a](b[1].png)"
+        self.assertEqual(text_to_textnodes(text), [
+            TextNode("docs", TextType.LINK, "https://api.x.com/items?filter[status]=open"),
+            TextNode(" ", TextType.TEXT),
+            TextNode("a", TextType.IMAGE, "b[1].png"),
+        ])
+        self.assertEqual(extract_markdown_links(text), [("docs", "https://api.x.com/items?filter[status]=open")])
+        self.assertEqual(extract_markdown_images(text), [("a", "b[1].png")])
+        self.assertEqual(split_nodes_link([TextNode(text, TextType.TEXT)])[0],
+                         TextNode("docs", TextType.LINK, "https://api.x.com/items?filter[status]=open"))
+
+    def test_unclosed_urls(self):
+        self.assertEqual(text_to_textnodes("[a](b [c](d) ![e](f"), [
+            TextNode("a", TextType.LINK, "b [c](d"),
+            TextNode(" ![e](f", TextType.TEXT),
+        ])
+        self.assertEqual(text_to_textnodes("[a](b *c*"), [
+            TextNode("[a](b ", TextType.TEXT),
+            TextNode("c", TextType.ITALIC),
+            TextNode("", TextType.TEXT),
+        ])
+
+    def test_same_as_split_passes(self):
+        for text in [
+            "", "*", "***a***", "a**b*c*d**e", "[a](b)![c](d)", "![a](b) **c** [d](e)",
+            "x `*y*` z", "!![a](b)", "[a](b", "*a*![b](c)`d`",
+        ]:
+            try:
+                nodes = split_nodes_link(split_nodes_image([TextNode(text, TextType.TEXT)]))
+                nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+                nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC)
+                nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+            except ValueError:
+                with self.assertRaises(ValueError):
+                    text_to_textnodes(text)
+            else:
+                self.assertEqual(text_to_textnodes(text), nodes)
+
+
+class TestInlineRules(unittest.TestCase):
+
+    def test_strikethrough(self):
+        self.assertEqual(text_to_textnodes("a ~~b~~ `~~`"), [
+            TextNode("a ", TextType.TEXT),
+            TextNode("b", TextType.STRIKETHROUGH),
+            TextNode(" ", TextType.TEXT),
+            TextNode("~~", TextType.CODE),
+            TextNode("", TextType.TEXT),
+        ])
+        self.assertEqual(text_to_textnodes("**a ~~b~~**")[1], TextNode("a ~~b~~", TextType.BOLD))
+
+    def test_lenient_rules(self):
+        # text that parsed before ~~ and autolinks were added
+        for text, nodes in [
+            ("approx ~~10 items", [TextNode("approx ~~10 items", TextType.TEXT)]),
+            ("use `a` or ~~", [
+                TextNode("use ", TextType.TEXT),
+                TextNode("a", TextType.CODE),
+                TextNode(" or ~~", TextType.TEXT),
+            ]),
+            ("**see <https://x.com>**", [
+                TextNode("", TextType.TEXT),
+                TextNode("see <https://x.com>", TextType.BOLD),
+                TextNode("", TextType.TEXT),
+            ]),
+            ("*docs at <https://a.b>*", [
+                TextNode("", TextType.TEXT),
+                TextNode("docs at <https://a.b>", TextType.ITALIC),
+                TextNode("", TextType.TEXT),
+            ]),
+            ("~~a **b~~ c**", [
+                TextNode("~~a ", TextType.TEXT),
+                TextNode("b~~ c", TextType.BOLD),
+                TextNode("", TextType.TEXT),
+            ]),
+            ("a ~~b~~ ~~c [d](e)", [
+                TextNode("a ", TextType.TEXT),
+                TextNode("b", TextType.STRIKETHROUGH),
+                TextNode(" ~~c ", TextType.TEXT),
+                TextNode("d", TextType.LINK, "e"),
+            ]),
+        ]:
+            with self.subTest(text):
+                self.assertEqual(text_to_textnodes(text), nodes)
+        with self.assertRaises(ValueError):
+            text_to_textnodes("~~a~~ **b")
+
+    def test_autolink(self):
+        self.assertEqual(text_to_textnodes("see <https://www.boot.dev/*a*> or <boot.dev>"), [
+            TextNode("see ", TextType.TEXT),
+            TextNode("https://www.boot.dev/*a*", TextType.LINK, "https://www.boot.dev/*a*"),
+            TextNode(" or <boot.dev>", TextType.TEXT),
+        ])
+
+    def test_html(self):
+        html = "<div><p>a <del>b</del> <a href=\"http://c\">http://c</a></p></div>"
+        self.assertEqual(markdown_to_html_node("a ~~b~~ <http://c>").to_html(), html)
+        self.assertEqual(markdown_to_html_many(["a ~~b~~ <http://c>"]), [html])
+
+    def test_custom_rules(self):
+        rules = InlineRules()
+        rules.add_element(r"@(\w+)", lambda user: TextNode(user, TextType.LINK, f"/u/{user}"))
+        rules.add_delimiter("==", "mark", "mark")
+        rules.add_delimiter("=", "small", "small")
+        self.assertEqual(text_to_textnodes("hi @bob ==x=y== *z*", rules=rules), [
+            TextNode("hi ", TextType.TEXT),
+            TextNode("bob", TextType.LINK, "/u/bob"),
+            TextNode(" ", TextType.TEXT),
+            TextNode("x=y", "mark"),
+            TextNode(" *z*", TextType.TEXT),
+        ])
+        with self.assertRaises(ValueError):
+            text_to_textnodes("=a ==b== c=", rules=rules)
+        rules.add_delimiter("*", TextType.ITALIC, "i")
+        self.assertEqual(text_to_textnodes("*z*", rules=rules)[1], TextNode("z", TextType.ITALIC))
+
+    def test_until(self):
+        rules = InlineRules()
+        rules.add_element(r"\{\{", lambda expr: TextNode(expr, TextType.CODE), "}}")
+        rules.add_delimiter("*", TextType.ITALIC, "i")
+        self.assertEqual(text_to_textnodes("{{a}b}} *c* {{d", rules=rules), [
+            TextNode("a}b", TextType.CODE),
+            TextNode(" ", TextType.TEXT),
+            TextNode("c", TextType.ITALIC),
+            TextNode(" {{d", TextType.TEXT),
+        ])
+
+    def test_rule_without_first_literal(self):
+        rules = InlineRules()
+        for pattern in [r"\w+", "(a)", "a*b", "[ab]"]:
+            with self.assertRaises(ValueError):
+                rules.add_element(pattern, TextNode)
+        rules.add_element(r"\$([^$]*)\$", lambda math: TextNode(math, TextType.CODE))
+        self.assertEqual(text_to_textnodes("$x$", rules=rules)[0], TextNode("x", TextType.CODE))
+
+    def test_no_rules(self):
+        self.assertEqual(text_to_textnodes("*a*", rules=InlineRules()), [TextNode("*a*", TextType.TEXT)])
+
+    def test_default_rules_unchanged(self):
+        self.assertEqual(inline_rules.tags[TextType.BOLD], "b")
+        self.assertNotIn("mark", inline_rules.tags)
+
+
+class TestMarkdownToHtmlNode(unittest.TestCase):
+
+    def test_paragraphs(self):
+        md = """
+This is **bolded** paragraph
+text in a p
+tag here
+
+This is another paragraph with *italic* text and `code` here
+"""
+        self.assertEqual(markdown_to_html_node(md).to_html(),
+            "<div><p>This is <b>bolded</b> paragraph text in a p tag here</p>"
+            "<p>This is another paragraph with <i>italic</i> text and <code>code</code> here</p></div>")
+
+    def test_headings(self):
+        md = "# Heading *one*\n\n###### Heading six"
+        self.assertEqual(markdown_to_html_node(md).to_html(),
+            "<div><h1>Heading <i>one</i></h1><h6>Heading six</h6></div>")
+
+    def test_code(self):
+        md = "```\nThis is text that _should_ remain\nthe **same** even with inline stuff\n```"
+        self.assertEqual(markdown_to_html_node(md).to_html(),
+            "<div><pre><code>This is text that _should_ remain\n"
+            "the **same** even with inline stuff</code></pre></div>")
+
+    def test_quote(self):
+        md = "> This is a\n> **quote**"
+        self.assertEqual(markdown_to_html_node(md).to_html(),
+            "<div><blockquote>This is a\n<b>quote</b></blockquote></div>")
+
+    def test_lists(self):
+        md = "- one\n- [two](https://www.boot.dev)\n\n1. first\n2. *second*"
+        self.assertEqual(markdown_to_html_node(md).to_html(),
+            '<div><ul><li>one</li><li><a href="https://www.boot.dev">two</a></li></ul>'
+            "<ol><li>first</li><li><i>second</i></li></ol></div>")
+
+    def test_empty(self):
+        self.assertEqual(markdown_to_html_node("").to_html(), "<div></div>")
+
+
+class TestSpansToHtmlNode(unittest.TestCase):
+
+    def test_same_as_blocks(self):
+        texts = [
+            "# Heading *one*\n\n###### Heading six",
+            "Some **bold**\ntext with [a](https://www.boot.dev)\n\n> a\n> **quote**",
+            "- one\n- `two`\n\n1. first\n2. *second*",
+            "```\ncode **not bold**\n```",
+            "  indented\n   lines  \n\n  - a  \n  - b",
+            "",
+        ]
+        for text in texts:
+            self.assertEqual(spans_to_html_node(markdown_to_spans(text)).to_html(),
+                             markdown_to_html_node(text).to_html())
+
+    def test_positions(self):
+        text = "# Title\n\ntext\nmore\n\n- a"
+        self.assertEqual(spans_to_html_node(markdown_to_spans(text), positions=True).to_html(),
+            '<div><h1 data-source-line="1">Title</h1>'
+            '<p data-source-line="3">text more</p>'
+            '<ul data-source-line="6"><li>a</li></ul></div>')
+
+    def test_error_position(self):
+        with self.assertRaisesRegex(ValueError, "line 3, column 2: invalid Markdown syntax"):
+            spans_to_html_node(markdown_to_spans("# Title\n\n **open"))
+
+
+class TestMarkdownToHtmlMany(unittest.TestCase):
+
+    docs = [
+        "",
+        "Read more",
+        "# Heading *one*\n\n###### Heading six",
+        "Some **bold**\ntext with [a](https://www.boot.dev) and ![i](/i.png)",
+        "> a\n> **quote**\n\n```\ncode **not bold**\n```",
+        "- one\n- `two`\n\n1. first\n2. *second*",
+        "Read more",
+    ]
+
+    def test_same_as_single(self):
+        self.assertEqual(markdown_to_html_many(self.docs),
+                         [markdown_to_html_node(doc).to_html() for doc in self.docs])
+
+    def test_stream(self):
+        results = markdown_to_html_many(iter(self.docs), stream=True)
+        self.assertEqual(next(results), "<div></div>")
+        self.assertEqual(list(results), markdown_to_html_many(self.docs)[1:])
+
+    def test_interned(self):
+        results = markdown_to_html_many(self.docs)
+        self.assertIs(results[1], results[-1])
+        results = markdown_to_html_many(self.docs, intern_length=0)
+        self.assertIsNot(results[1], results[-1])
+
+    def test_error(self):
+        with self.assertRaisesRegex(ValueError, "document 1: invalid Markdown syntax"):
+            markdown_to_html_many(["ok", "**open"])
+
+
+class TestExtractTitle(unittest.TestCase):
+
+    def test_title(self):
+        self.assertEqual(extract_title(["Text", "## Sub", "# Hello  "]), "Hello")
+
+    def test_missing_title(self):
+        with self.assertRaises(ValueError):
+            extract_title(["Text", "## Sub"])
+
+
+class TestInlineCache(unittest.TestCase):
+
+    def tearDown(self):
+        use_inline_cache(None)
+
+    def test_get(self):
+        cache = InlineCache()
+        self.assertEqual(cache.get("a **b** [c](d)"), 'a <b>b</b> <a href="d">c</a>')
+        self.assertEqual(cache.get("a **b** [c](d)"), 'a <b>b</b> <a href="d">c</a>')
+        self.assertEqual(cache.get(""), "")
+        self.assertEqual(cache.get(""), "")
+        self.assertEqual(cache.stats(), {
+            "hits": 2, "misses": 2, "evictions": 0, "entries": 2, "size": 42,
+        })
+
+    def test_eviction(self):
+        cache = InlineCache(max_size=40)
+        cache.get("one")
+        cache.get("two")
+        cache.get("one")
+        cache.get("*three*")
+        cache.get("*four*")
+        self.assertEqual(list(cache.entries), ["*three*", "*four*"])
+        self.assertEqual(cache.evictions, 2)
+        self.assertLessEqual(cache.size, 40)
+
+    def test_invalid(self):
+        cache = InlineCache()
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                cache.get("**unclosed")
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_markdown_to_html_node(self):
+        md = "# Title\n\n- **one**\n- two\n\n> **one**\n\nlong " + "*text* " * 200
+        html = markdown_to_html_node(md).to_html()
+        cache = use_inline_cache(max_length=100)
+        self.assertIs(use_inline_cache(max_length=100), cache)
+        self.assertEqual(markdown_to_html_node(md).to_html(), html)
+        self.assertEqual(markdown_to_html_node(md).to_html(), html)
+        self.assertEqual((cache.hits, cache.misses), (5, 3))
+        use_inline_cache(None)
+        self.assertEqual(markdown_to_html_node(md).to_html(), html)
+        self.assertEqual((cache.hits, cache.misses), (5, 3))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,6 +1,6 @@
 import unittest
 
-from htmlnode import HTMLNode
+from htmlnode import HTMLNode, PropsCache, props_to_html
 
 
 class TestHTMLNode(unittest.TestCase):
@@ -29,6 +29,41 @@ class TestHTMLNode(unittest.TestCase):
         par = HTMLNode(tag = "p", value = "a paragraph", children = [facebook, google])
         self.assertEqual(par.props_to_html(), "")
 
+    def test_escape(self):
+        props = {"href": "/search?q=a&b=\"c\"", "alt": "<it's>", "width": 10}
+        self.assertEqual(
+            props_to_html(props),
+            ' href="/search?q=a&amp;b=&quot;c&quot;" alt="&lt;it&#x27;s&gt;" width="10"',
+        )
+
+
+class TestPropsCache(unittest.TestCase):
+
+    def test_hits(self):
+        cache = PropsCache()
+        self.assertEqual(cache.get({"href": "a&b"}), ' href="a&amp;b"')
+        self.assertEqual(cache.get({"href": "a&b"}), ' href="a&amp;b"')
+        self.assertEqual(cache.get({"href": "c"}), ' href="c"')
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 2, "evictions": 0, "entries": 2})
+
+    def test_evictions(self):
+        cache = PropsCache(max_entries=2)
+        for href in ["a", "b", "a", "c", "b"]:
+            cache.get({"href": href})
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 4, "evictions": 2, "entries": 2})
+
+    def test_equal_values(self):
+        cache = PropsCache()
+        for value, html in [(1, ' n="1"'), (True, ' n="True"'), (1.0, ' n="1.0"'), ("1", ' n="1"')]:
+            self.assertEqual(cache.get({"n": value}), html)
+        self.assertEqual(cache.stats()["entries"], 1)
+
+    def test_uncached(self):
+        cache = PropsCache(max_length=20)
+        self.assertEqual(cache.get({"src": "data:" + "a" * 20}), f' src="data:{"a" * 20}"')
+        self.assertEqual(cache.get({"class": ["a"]}), ' class="[&#x27;a&#x27;]"')
+        self.assertEqual(cache.stats()["entries"], 0)
+
 if __name__ == "__main__":
     unittest.main()
 
@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from leafnode import LeafNode
@@ -22,6 +23,16 @@ class TestLeafNode(unittest.TestCase):
             facebook = LeafNode("a", "Facebook", None, {"href": "https://www.facebook.com"})
             par = LeafNode("p", "a paragraph", [facebook, google], None)
 
+    def test_write_html(self):
+        node = LeafNode("a", "Google", {"href": "https://www.google.com"})
+        out = io.StringIO()
+        node.write_html(out)
+        self.assertEqual(out.getvalue(), node.to_html())
+
+    def test_slots(self):
+        node = LeafNode("p", "This is a paragraph of text.")
+        self.assertFalse(hasattr(node, "__dict__"))
+
 if __name__ == "__main__":
     unittest.main()
 
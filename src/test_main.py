@@ -0,0 +1,297 @@
+import gzip
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import main
+import conversion
+from conversion import markdown_to_html_node, use_inline_cache
+from main import MANIFEST, find_pages, generate_site, snapshot, wait_for_changes
+
+template = "<html><title>{{ Title }}</title><body>{{ Content }}</body></html>"
+
+pages = {
+    "index.md": "# Home\n\nWelcome to the **site**.",
+    os.path.join("blog", "first.md"): "# First\n\n- one\n- two",
+    os.path.join("blog", "second", "index.md"): "# Second\n\n> quoted",
+}
+
+class SiteTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.static = os.path.join(self.tmp.name, "static")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        for page, markdown in pages.items():
+            path = os.path.join(self.content, page)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(markdown)
+        os.makedirs(self.static)
+        with open(os.path.join(self.static, "styles.css"), "w") as f:
+            f.write("body {}")
+        with open(self.template, "w") as f:
+            f.write(template)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self, *path):
+        with open(os.path.join(*path), encoding="utf-8") as f:
+            return f.read()
+
+class TestGenerateSite(SiteTestCase):
+
+    def test_find_pages(self):
+        self.assertEqual(find_pages(self.content), [
+            "index.md",
+            os.path.join("blog", "first.md"),
+            os.path.join("blog", "second", "index.md"),
+        ])
+
+    def test_generate_site(self):
+        dest = os.path.join(self.tmp.name, "public")
+        generate_site(self.content, self.template, dest, self.static, jobs=1)
+        self.assertEqual(self.read(dest, "index.html"),
+            "<html><title>Home</title><body><div><h1>Home</h1>"
+            "<p>Welcome to the <b>site</b>.</p></div></body></html>")
+        self.assertEqual(self.read(dest, "blog", "first.html"),
+            "<html><title>First</title><body><div><h1>First</h1>"
+            "<ul><li>one</li><li>two</li></ul></div></body></html>")
+        self.assertEqual(self.read(dest, "styles.css"), "body {}")
+
+    def test_parallel(self):
+        serial = os.path.join(self.tmp.name, "serial")
+        parallel = os.path.join(self.tmp.name, "parallel")
+        self.assertEqual(
+            [os.path.relpath(p, serial) for p in generate_site(self.content, self.template, serial, jobs=1)],
+            [os.path.relpath(p, parallel) for p in generate_site(self.content, self.template, parallel, jobs=2)],
+        )
+        for page in pages:
+            page = os.path.splitext(page)[0] + ".html"
+            self.assertEqual(self.read(serial, page), self.read(parallel, page))
+
+    def test_profile(self):
+        profile = {}
+        generate_site(self.content, self.template, os.path.join(self.tmp.name, "public"),
+                      jobs=2, profile=profile)
+        self.assertEqual(sorted(profile), sorted(pages))
+        stats = profile["index.md"]
+        self.assertEqual(stats["stages"]["read"][1], 1)
+        self.assertEqual(stats["counters"]["blocks"], 2)
+        self.assertIn("props cache hits", stats["counters"])
+        self.assertLessEqual(sum(s for s, _ in stats["stages"].values()), stats["seconds"])
+
+    def test_inline_cache(self):
+        plain = os.path.join(self.tmp.name, "plain")
+        cached = os.path.join(self.tmp.name, "cached")
+        generate_site(self.content, self.template, plain, jobs=1)
+        profile = {}
+        generate_site(self.content, self.template, cached, jobs=1, profile=profile,
+                      inline_cache=1 << 20)
+        self.assertIsNone(conversion.inline_cache)
+        for page in pages:
+            page = os.path.splitext(page)[0] + ".html"
+            self.assertEqual(self.read(plain, page), self.read(cached, page))
+        self.assertEqual(sum(s["counters"]["inline cache misses"] for s in profile.values()), 7)
+
+    def test_inline_cache_not_kept(self):
+        cache = use_inline_cache()
+        try:
+            generate_site(self.content, self.template, os.path.join(self.tmp.name, "public"),
+                          jobs=1, inline_cache=1 << 20)
+            self.assertIs(conversion.inline_cache, cache)
+            self.assertEqual(cache.stats()["entries"], 0)
+        finally:
+            use_inline_cache(None)
+        generate_site(self.content, self.template, os.path.join(self.tmp.name, "public"),
+                      jobs=1, force=True, inline_cache=1 << 20)
+        self.assertIsNone(conversion.inline_cache)
+        # a leaf per text node, not one with the cached HTML
+        self.assertEqual(len(markdown_to_html_node("a **b**").children[0].children), 3)
+
+    def test_block_cache(self):
+        plain = os.path.join(self.tmp.name, "plain")
+        cached = os.path.join(self.tmp.name, "cached")
+        db = os.path.join(self.tmp.name, "blocks.db")
+        generate_site(self.content, self.template, plain, jobs=1)
+        for jobs in [1, 2]:
+            profile = {}
+            generate_site(self.content, self.template, cached, jobs=jobs, force=True,
+                          profile=profile, block_cache=db)
+            for page in pages:
+                page = os.path.splitext(page)[0] + ".html"
+                self.assertEqual(self.read(plain, page), self.read(cached, page))
+        self.assertEqual(sum(s["counters"]["block cache hits"] for s in profile.values()), 6)
+
+        with open(os.path.join(self.content, "index.md"), "a") as f:
+            f.write("\n\nMore text.")
+        profile = {}
+        generate_site(self.content, self.template, cached, jobs=1, profile=profile,
+                      block_cache=db)
+        self.assertEqual(profile["index.md"]["counters"]["block cache hits"], 2)
+        self.assertEqual(profile["index.md"]["counters"]["block cache misses"], 1)
+        self.assertIn("<p>More text.</p>", self.read(cached, "index.html"))
+
+    def test_large_page(self):
+        markdown = "# Large\n\n" + "\n\n".join(f"Paragraph **{i}**" for i in range(1000))
+        with open(os.path.join(self.content, "large.md"), "w", encoding="utf-8") as f:
+            f.write(markdown)
+        small = os.path.join(self.tmp.name, "small")
+        large = os.path.join(self.tmp.name, "large")
+        generate_site(self.content, self.template, small, jobs=1)
+        with mock.patch.object(main, "LARGE_PAGE", 1):
+            generate_site(self.content, self.template, large, jobs=1)
+        self.assertEqual(self.read(large, "large.html"), self.read(small, "large.html"))
+        self.assertEqual(self.read(large, "index.html"), self.read(small, "index.html"))
+        self.assertFalse(os.path.exists(os.path.join(large, "large.html.tmp")))
+
+    def test_large_page_invalid(self):
+        with open(os.path.join(self.content, "large.md"), "w", encoding="utf-8") as f:
+            f.write("# Large\n\nunclosed **bold")
+        dest = os.path.join(self.tmp.name, "public")
+        with mock.patch.object(main, "LARGE_PAGE", 1):
+            with self.assertRaisesRegex(ValueError, "large.md"):
+                generate_site(self.content, self.template, dest, jobs=1)
+        self.assertFalse(os.path.exists(os.path.join(dest, "large.html.tmp")))
+        self.assertFalse(os.path.exists(os.path.join(dest, "large.html")))
+
+    def test_invalid_page(self):
+        with open(os.path.join(self.content, "broken.md"), "w") as f:
+            f.write("# Broken\n\nunclosed **bold")
+        with self.assertRaisesRegex(ValueError, "broken.md"):
+            generate_site(self.content, self.template, os.path.join(self.tmp.name, "public"), jobs=1)
+
+class TestIncrementalBuild(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.dest = os.path.join(self.tmp.name, "public")
+        self.build()
+
+    def build(self, **kwargs):
+        return [os.path.relpath(p, self.dest) for p in
+                generate_site(self.content, self.template, self.dest, self.static, jobs=1, **kwargs)]
+
+    def write(self, page, markdown):
+        with open(os.path.join(self.content, page), "w", encoding="utf-8") as f:
+            f.write(markdown)
+
+    def test_unchanged(self):
+        self.assertEqual(self.build(), [])
+        self.assertTrue(os.path.exists(os.path.join(self.dest, MANIFEST)))
+
+    def test_changed_page(self):
+        self.write("index.md", "# Home\n\nChanged page.")
+        self.assertEqual(self.build(), ["index.html"])
+        self.assertIn("Changed page.", self.read(self.dest, "index.html"))
+
+    def test_same_content(self):
+        self.write("index.md", pages["index.md"])
+        self.assertEqual(self.build(), [])
+
+    def test_missing_output(self):
+        os.remove(os.path.join(self.dest, "blog", "first.html"))
+        self.assertEqual(self.build(), [os.path.join("blog", "first.html")])
+
+    def test_deleted_page(self):
+        os.remove(os.path.join(self.content, "blog", "second", "index.md"))
+        self.assertEqual(self.build(), [])
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog", "second")))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "blog", "first.html")))
+
+    def test_changed_template(self):
+        with open(self.template, "w") as f:
+            f.write("<main>{{ Content }}</main>")
+        self.assertEqual(len(self.build()), len(pages))
+
+    def test_force(self):
+        self.assertEqual(len(self.build(force=True)), len(pages))
+
+    def test_gzip(self):
+        self.assertEqual(self.build(gzip=True), [])
+        for page in ["index.html", os.path.join("blog", "first.html")]:
+            with gzip.open(os.path.join(self.dest, page + ".gz"), "rt", encoding="utf-8") as f:
+                self.assertEqual(f.read(), self.read(self.dest, page))
+        with gzip.open(os.path.join(self.dest, "styles.css.gz"), "rt") as f:
+            self.assertEqual(f.read(), "body {}")
+
+    def test_gzip_unchanged_output(self):
+        self.build(gzip=True)
+        page = os.path.join(self.dest, "index.html")
+        mtimes = [os.stat(path).st_mtime_ns for path in [page, page + ".gz"]]
+        self.write("index.md", pages["index.md"] + "\n\n")
+        self.assertEqual(self.build(gzip=True), ["index.html"])
+        self.assertEqual(len(self.build(gzip=True, force=True)), len(pages))
+        # the server only uses a .gz at least as new as its page
+        self.assertEqual([os.stat(path).st_mtime_ns for path in [page, page + ".gz"]], mtimes)
+        self.assertFalse(os.path.exists(page + ".tmp"))
+
+    def test_gzip_changed_output(self):
+        self.build(gzip=True)
+        page = os.path.join(self.dest, "index.html")
+        self.write("index.md", "# Home\n\nChanged page.")
+        self.build(gzip=True)
+        with gzip.open(page + ".gz", "rt", encoding="utf-8") as f:
+            self.assertEqual(f.read(), self.read(page))
+        self.assertGreaterEqual(os.stat(page + ".gz").st_mtime_ns, os.stat(page).st_mtime_ns)
+
+    def test_gzip_deleted_page(self):
+        self.build(gzip=True)
+        os.remove(os.path.join(self.content, "index.md"))
+        self.build(gzip=True)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "index.html.gz")))
+
+    def test_deleted_static_file(self):
+        os.makedirs(os.path.join(self.static, "img"))
+        with open(os.path.join(self.static, "img", "logo.svg"), "w") as f:
+            f.write("<svg></svg>")
+        self.build(gzip=True)
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "img", "logo.svg.gz")))
+        os.remove(os.path.join(self.static, "img", "logo.svg"))
+        self.build(gzip=True)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "img")))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "styles.css.gz")))
+
+    def test_static_file_replaced_by_page(self):
+        with open(os.path.join(self.static, "about.html"), "w") as f:
+            f.write("static about")
+        self.build()
+        os.remove(os.path.join(self.static, "about.html"))
+        self.write("about.md", "# About\n\nA page now.")
+        self.assertEqual(self.build(), ["about.html"])
+        self.assertIn("A page now.", self.read(self.dest, "about.html"))
+
+    def test_page_replaced_by_static_file(self):
+        os.remove(os.path.join(self.content, "index.md"))
+        with open(os.path.join(self.static, "index.html"), "w") as f:
+            f.write("static index")
+        self.build()
+        self.assertEqual(self.read(self.dest, "index.html"), "static index")
+
+class TestWatch(SiteTestCase):
+
+    def test_snapshot(self):
+        state = snapshot([self.content, self.template, None])
+        self.assertEqual(len(state), len(pages) + 1)
+        self.assertIn(self.template, state)
+
+    def test_wait_for_changes(self):
+        paths = [self.content, self.template]
+        state = snapshot(paths)
+        def edit():
+            for i in range(3):
+                with open(os.path.join(self.content, "index.md"), "a") as f:
+                    f.write(f"\n\nEdit {i}")
+        timer = threading.Timer(0.05, edit)
+        timer.start()
+        changed = wait_for_changes(paths, state, interval=0.01, debounce=0.05)
+        timer.join()
+        self.assertNotEqual(changed, state)
+        self.assertEqual(changed, snapshot(paths))
+
+if __name__ == "__main__":
+    unittest.main()
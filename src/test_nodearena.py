@@ -0,0 +1,119 @@
+import unittest
+
+from conversion import markdown_to_html_node
+from nodearena import NONE, NodeArena
+from leafnode import LeafNode
+from parentnode import ParentNode
+from textnode import TextNode, TextType
+
+leafs = [
+    LeafNode("b", "Bold text"),
+    LeafNode(None, "Normal text"),
+    LeafNode("i", "Italic text"),
+    LeafNode("a", "Link text", {"href": "https://www.boot.dev", "target": "_blank"}),
+]
+
+tree = ParentNode("div", [
+    ParentNode("p", leafs),
+    ParentNode("p", []),
+    LeafNode("img", "", {"src": "https://www.boot.dev/img.png", "alt": "image"}),
+    ParentNode("ul", [ParentNode("li", leafs), ParentNode("li", leafs)], {"class": "list"}),
+])
+
+class TestNodeArena(unittest.TestCase):
+
+    def test_leaf(self):
+        node = LeafNode("a", "Google", {"href": "https://www.google.com"})
+        self.assertEqual(NodeArena.from_node(node).to_html(), node.to_html())
+
+    def test_to_html(self):
+        self.assertEqual(NodeArena.from_node(tree).to_html(), tree.to_html())
+
+    def test_to_node(self):
+        self.assertEqual(NodeArena.from_node(tree).to_node(), tree)
+
+    def test_subtree(self):
+        arena = NodeArena.from_node(tree)
+        ul = list(arena.children(0))[3]
+        self.assertEqual(arena.to_html(ul), tree.children[3].to_html())
+        self.assertEqual(arena.to_node(ul), tree.children[3])
+
+    def test_interned(self):
+        arena = NodeArena.from_node(tree)
+        self.assertEqual(len(arena), 19)
+        self.assertEqual(len(arena.strings), len(set(arena.strings)))
+        self.assertEqual(len(arena.prop_sets), 3)
+
+    def test_equal_props(self):
+        node = ParentNode("div", [
+            LeafNode("td", "a", {"colspan": 1}),
+            LeafNode("td", "b", {"colspan": True}),
+            LeafNode("td", "c", {"colspan": 1.0}),
+        ])
+        arena = NodeArena.from_node(node)
+        self.assertEqual(arena.to_html(), node.to_html())
+        self.assertEqual(arena.to_node(), node)
+        self.assertEqual(len(arena.prop_sets), 3)
+
+    def test_deep(self):
+        arena = NodeArena()
+        node = NONE
+        for _ in range(100000):
+            node = arena.add_parent(node, "div")
+        arena.add_leaf(node, None, "deep")
+        self.assertEqual(arena.to_html(), "<div>" * 100000 + "deep" + "</div>" * 100000)
+
+    def test_text_nodes(self):
+        nodes = [
+            TextNode("This is ", TextType.TEXT),
+            TextNode("bold", TextType.BOLD),
+            TextNode("italic", TextType.ITALIC),
+            TextNode("code", TextType.CODE),
+            TextNode("link", TextType.LINK, "https://www.boot.dev"),
+            TextNode("image", TextType.IMAGE, "https://www.boot.dev/img.png"),
+        ]
+        arena = NodeArena()
+        p = arena.add_parent(NONE, "p")
+        for node in nodes:
+            arena.add_text_node(p, node)
+        self.assertEqual(arena.to_html(),
+            '<p>This is <b>bold</b><i>italic</i><code>code</code>'
+            '<a href="https://www.boot.dev">link</a>'
+            '<img src="https://www.boot.dev/img.png" alt="image"></img></p>')
+
+    def test_from_markdown(self):
+        markdown = (
+            "# Title **bold**\n\nSome *italic* text\nwith [a link](https://boot.dev)\n\n"
+            "```\ncode\n```\n\n> quoted `code`\n> lines\n\n- one\n- ![two](img.png)\n\n"
+            "1. first\n2. ~~second~~\n\n###### Small"
+        )
+        node = markdown_to_html_node(markdown)
+        arena = NodeArena.from_markdown(markdown)
+        self.assertEqual(arena.to_node(), node)
+        self.assertEqual(arena.to_html(), node.to_html())
+        with self.assertRaises(ValueError):
+            NodeArena.from_markdown("unclosed **bold")
+
+    def test_add_markdown(self):
+        arena = NodeArena()
+        root = arena.add_parent(NONE, "body")
+        pages = ["# One", "- two\n- three"]
+        for markdown in pages:
+            arena.add_markdown(root, markdown)
+        self.assertEqual(arena.to_html(),
+            "<body>" + "".join(markdown_to_html_node(p).to_html() for p in pages) + "</body>")
+
+    def test_unknown_text_type(self):
+        with self.assertRaises(ValueError):
+            NodeArena().add_text_node(NONE, TextNode("some text", None))
+
+    def test_missing_tag(self):
+        with self.assertRaises(ValueError):
+            NodeArena.from_node(ParentNode(None, []))
+
+    def test_missing_children(self):
+        with self.assertRaises(ValueError):
+            NodeArena.from_node(ParentNode("p", None))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from parentnode import ParentNode
@@ -97,6 +98,54 @@ class TestParentNode(unittest.TestCase):
             "<h2><b>Bold text</b>Normal text<i>italic text</i>Normal text</h2>",
         )
 
+    def test_deep(self):
+        node = LeafNode(None, "deep")
+        for _ in range(100000):
+            node = ParentNode("div", [node])
+        self.assertEqual(node.to_html(), "<div>" * 100000 + "deep" + "</div>" * 100000)
+
+    def test_wide(self):
+        node = ParentNode("ul", [ParentNode("li", leafs)] * 10000, {"class": "wide"})
+        self.assertEqual(node.to_html(),
+            '<ul class="wide">' + ("<li>" + html_leafs + "</li>") * 10000 + "</ul>")
+
+    def test_nested_none_children(self):
+        with self.assertRaises(ValueError):
+            node = ParentNode("div", [LeafNode(None, "text"), ParentNode("p", None)])
+            node.to_html()
+
+    def test_write_html_text(self):
+        node = ParentNode("div", [ParentNode("p", leafs)] * 100)
+        out = io.StringIO()
+        node.write_html(out)
+        self.assertEqual(out.getvalue(), node.to_html())
+
+    def test_write_html_binary(self):
+        node = ParentNode("p", [LeafNode("b", "Grüße")] * 100)
+        out = io.BytesIO()
+        node.write_html(out, chunk_size=64)
+        self.assertEqual(out.getvalue(), node.to_html().encode("utf-8"))
+
+    def test_write_html_chunks(self):
+        class Sink:
+            def __init__(self):
+                self.writes = []
+                self.flushes = 0
+            def write(self, data):
+                self.writes.append(data)
+            def flush(self):
+                self.flushes += 1
+        node = ParentNode("div", [ParentNode("p", leafs)] * 100)
+        out = Sink()
+        node.write_html(out, chunk_size=1000)
+        self.assertEqual(b"".join(out.writes), node.to_html().encode("utf-8"))
+        self.assertGreater(len(out.writes), 1)
+        self.assertEqual(out.flushes, len(out.writes))
+
+    def test_slots(self):
+        node = ParentNode("p", leafs)
+        self.assertFalse(hasattr(node, "__dict__"))
+
 if __name__ == "__main__":
     unittest.main()
 
@@ -0,0 +1,26 @@
+import unittest
+
+from bench_pathological import PARSERS, PATHOLOGICAL, parse_time
+
+# A quadratic parser takes seconds for most of these, a linear one a few ms.
+LIMIT = 1.0
+
+class TestPathological(unittest.TestCase):
+
+    def test_linear_time(self):
+        for name, make in PATHOLOGICAL.items():
+            markdown = make(10000)
+            for label, parse in PARSERS.items():
+                with self.subTest(name, parser=label):
+                    self.assertLess(parse_time(parse, markdown), LIMIT)
+
+    def test_mixed_delimiters_valid(self):
+        # invalid early on, only the error path would be timed
+        markdown = PATHOLOGICAL["mixed delimiters"](100)
+        for label, parse in PARSERS.items():
+            with self.subTest(parser=label):
+                parse(markdown)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import io
+import unittest
+
+import blocks
+import conversion
+import htmlnode
+from conversion import markdown_to_html_node
+from profiler import Profiler, format_report, merge_stats
+
+markdown = "# Title\n\nSome **bold** text\n\n- a *list*\n- of `code`"
+
+class TestProfiler(unittest.TestCase):
+
+    def test_hooks_removed(self):
+        originals = [
+            conversion.text_to_textnodes,
+            blocks.markdown_to_blocks,
+            vars(htmlnode.HTMLNode)["_write_chunk"],
+        ]
+        with Profiler().install():
+            self.assertIsNot(conversion.text_to_textnodes, originals[0])
+            self.assertIsInstance(vars(htmlnode.HTMLNode)["_write_chunk"], staticmethod)
+        self.assertEqual([
+            conversion.text_to_textnodes,
+            blocks.markdown_to_blocks,
+            vars(htmlnode.HTMLNode)["_write_chunk"],
+        ], originals)
+
+    def test_same_output(self):
+        plain = markdown_to_html_node(markdown).to_html()
+        with Profiler().install():
+            self.assertEqual(markdown_to_html_node(markdown).to_html(), plain)
+            out = io.StringIO()
+            markdown_to_html_node(markdown).write_html(out)
+        self.assertEqual(out.getvalue(), plain)
+
+    def test_stages(self):
+        with Profiler().install() as profiler:
+            node = markdown_to_html_node(markdown)
+            node.write_html(io.StringIO())
+        stats = profiler.stats(1.0)
+        calls = {stage: calls for stage, (_, calls) in stats["stages"].items()}
+        self.assertEqual(calls, {
+            "split": 1,
+            "classify": 3,
+            "inline": 4,
+            "convert": 3,
+            "serialize": 1,
+            "write": 1,
+        })
+        self.assertEqual(stats["counters"], {"blocks": 3, "text nodes": 10})
+
+    def test_nested_time_excluded(self):
+        profiler = Profiler()
+        namespace = type("namespace", (), {})
+        namespace.inner = lambda: sum(range(100000)) and []
+        namespace.outer = lambda: namespace.inner()
+        profiler.hook(namespace, "inner", "inner")
+        profiler.hook(namespace, "outer", "outer")
+        namespace.outer()
+        profiler.remove()
+        inner, outer = profiler.stages["inner"][0], profiler.stages["outer"][0]
+        self.assertGreater(inner, outer)
+
+    def test_exception(self):
+        with Profiler().install() as profiler:
+            with self.assertRaises(ValueError):
+                conversion.text_to_textnodes("**unclosed")
+            conversion.text_to_textnodes("closed")
+        self.assertEqual(profiler.stages["inline"][1], 2)
+        self.assertEqual(profiler.nested, [])
+
+    def test_report(self):
+        pages = {}
+        for page, size in [("a.md", 1), ("b.md", 3), ("c.md", 2)]:
+            with Profiler().install() as profiler:
+                markdown_to_html_node("\n\n".join([markdown] * size)).to_html()
+            pages[page] = profiler.stats(size)
+        self.assertEqual(merge_stats(pages.values())["counters"]["blocks"], 18)
+        report = format_report(pages, top=2)
+        self.assertIn("total                6.000 in 3 pages", report)
+        self.assertIn("slowest 2 pages", report)
+        self.assertLess(report.index("b.md"), report.index("c.md"))
+        self.assertNotIn("a.md", report)
+
+
+if __name__ == "__main__":
+    unittest.main()
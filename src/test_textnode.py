@@ -35,6 +35,12 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("This is a text node", "bold", None)
         self.assertEqual(node, node2)
 
+    def test_slots(self):
+        node = TextNode("This is a text node", "bold")
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.children = []
+
 
 if __name__ == "__main__":
     unittest.main()
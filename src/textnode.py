@@ -3,11 +3,14 @@ class TextType:
     BOLD    = "bold"
     ITALIC  = "italic"
     CODE    = "code"
+    STRIKETHROUGH = "strikethrough"
     LINK    = "link"
     IMAGE   = "image"
 
 class TextNode:
 
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url = None):
         self.text = text
         self.text_type = text_type
@@ -1,2 +1 @@
-python -m unittest discover -s src $*
-
+python -m unittest discover -s src $* && python -m unittest discover -s . $*
@@ -0,0 +1,433 @@
+import gzip
+import http.client
+import os
+import zlib
+import tempfile
+import threading
+import time
+import unittest
+from functools import partial
+
+from server import CachedFileHandler, FileCache, KeepAliveHandler, LiveReload, PooledHTTPServer
+
+files = {
+    "index.html": b"<html><body>home</body></html>",
+    "styles.css": b"body { color: black; }\n" * 100,
+    "data.bin": bytes(range(256)) * 4,
+}
+
+# Serves a temporary directory with files in it from a PooledHTTPServer on
+# a free port, in a thread of its own.
+class ServerTestCase(unittest.TestCase):
+
+    handler_class = CachedFileHandler
+    workers = 4
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        for name, data in files.items():
+            self.write(name, data)
+        attrs = {"log_message": lambda *args: None}
+        if issubclass(self.handler_class, CachedFileHandler):
+            # a cache of its own, the handler's is shared by all servers
+            attrs["cache"] = self.cache = FileCache()
+        handler_class = type("Handler", (self.handler_class,), attrs)
+        self.server = PooledHTTPServer(
+            ("127.0.0.1", 0), partial(handler_class, directory=self.tmp.name), self.workers
+        )
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.01}
+        )
+        self.thread.start()
+
+    def tearDown(self):
+        self.stop()
+        self.tmp.cleanup()
+
+    def stop(self):
+        if self.thread.is_alive():
+            self.server.shutdown()
+            self.server.server_close()
+            self.thread.join()
+
+    def write(self, name, data):
+        with open(os.path.join(self.tmp.name, name), "wb") as f:
+            f.write(data)
+
+    def connect(self):
+        return http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+
+    # (response, body) of a request on a new connection.
+    def get(self, path, headers={}, method="GET"):
+        conn = self.connect()
+        try:
+            conn.request(method, path, headers=headers)
+            response = conn.getresponse()
+            return response, response.read()
+        finally:
+            conn.close()
+
+class TestPooledServer(ServerTestCase):
+
+    handler_class = KeepAliveHandler
+    workers = 2
+
+    def test_keep_alive(self):
+        conn = self.connect()
+        conn.request("GET", "/index.html")
+        response = conn.getresponse()
+        self.assertEqual(response.read(), files["index.html"])
+        sock = conn.sock
+        conn.request("GET", "/styles.css")
+        response = conn.getresponse()
+        self.assertEqual(response.read(), files["styles.css"])
+        self.assertIs(conn.sock, sock)
+        conn.close()
+
+    def test_concurrent(self):
+        results = []
+        def get():
+            results.append(self.get("/data.bin")[1])
+        threads = [threading.Thread(target=get) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, [files["data.bin"]] * 8)
+
+    def test_idle_connections_dont_block(self):
+        # idle keep-alive connections holding all workers
+        idle = []
+        for _ in range(self.workers):
+            conn = self.connect()
+            conn.request("GET", "/index.html")
+            conn.getresponse().read()
+            idle.append(conn)
+        start = time.monotonic()
+        response, body = self.get("/index.html")
+        self.assertEqual(body, files["index.html"])
+        self.assertLess(time.monotonic() - start, 2)
+        for conn in idle:
+            conn.close()
+
+    def test_shutdown_closes_idle_connections(self):
+        conn = self.connect()
+        conn.request("GET", "/index.html")
+        conn.getresponse().read()
+        start = time.monotonic()
+        self.stop()
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual(conn.sock.recv(1), b"")
+        conn.close()
+
+    def test_bind_error(self):
+        with self.assertRaises(OSError):
+            PooledHTTPServer(("127.0.0.1", self.port), KeepAliveHandler)
+
+
+class TestFileCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_get(self):
+        cache = FileCache()
+        path = self.write("a", b"data")
+        entry = cache.get(path)
+        self.assertEqual(entry.data, b"data")
+        self.assertIs(cache.get(path), entry)
+        self.assertIsNone(cache.get(os.path.join(self.tmp.name, "missing")))
+        self.assertIsNone(cache.get(self.tmp.name))
+
+    def test_max_file_size(self):
+        cache = FileCache(max_file_size=10)
+        self.assertIsNone(cache.get(self.write("a", b"x" * 11)))
+        self.assertEqual(cache.size, 0)
+
+    def test_lru_eviction(self):
+        cache = FileCache(max_bytes=1000)
+        a, b, c = (self.write(name, name.encode() * 400) for name in "abc")
+        cache.get(a)
+        cache.get(b)
+        cache.get(a)
+        cache.get(c)
+        self.assertEqual(list(cache.entries), [a, c])
+        self.assertEqual(cache.size, 800)
+
+    def test_size_with_encodings(self):
+        cache = FileCache(max_bytes=3000)
+        paths = [self.write(f"{i}.txt", bytes(range(256)) * 4) for i in range(3)]
+        for path in paths:
+            entry = cache.get(path)
+            cache.encode(path, entry, "gzip")
+            cache.encode(path, entry, "deflate")
+            self.assertLessEqual(cache.size, cache.max_bytes)
+        self.assertEqual(cache.size, sum(e.cost() for e in cache.entries.values()))
+
+    def test_recheck_interval(self):
+        cache = FileCache(interval=3600)
+        path = self.write("a", b"old")
+        entry = cache.get(path)
+        self.write("a", b"newer")
+        # not looked at again before the interval is over
+        self.assertIs(cache.get(path), entry)
+        entry.checked -= 3600
+        self.assertEqual(cache.get(path).data, b"newer")
+        self.assertEqual(cache.size, 5)
+
+    def test_recheck_unchanged(self):
+        cache = FileCache(interval=0)
+        path = self.write("a", b"data")
+        entry = cache.get(path)
+        self.assertIs(cache.get(path), entry)
+        os.remove(path)
+        self.assertIsNone(cache.get(path))
+        self.assertEqual(cache.size, 0)
+
+class TestConditionalRequests(ServerTestCase):
+
+    def test_etag(self):
+        response, _ = self.get("/styles.css")
+        etag = response.getheader("ETag")
+        for tag in [etag, "W/" + etag, "*", f'"other", {etag}']:
+            response, body = self.get("/styles.css", {"If-None-Match": tag})
+            self.assertEqual((response.status, body), (304, b""))
+            self.assertEqual(response.getheader("ETag"), etag)
+        response, body = self.get("/styles.css", {"If-None-Match": '"other"'})
+        self.assertEqual((response.status, body), (200, files["styles.css"]))
+
+    def test_if_modified_since(self):
+        response, _ = self.get("/styles.css")
+        last_modified = response.getheader("Last-Modified")
+        response, body = self.get("/styles.css", {"If-Modified-Since": last_modified})
+        self.assertEqual((response.status, body), (304, b""))
+        for since in ["Thu, 01 Jan 1970 00:00:00 GMT", "yesterday"]:
+            response, _ = self.get("/styles.css", {"If-Modified-Since": since})
+            self.assertEqual(response.status, 200)
+        # If-None-Match wins over If-Modified-Since
+        response, _ = self.get("/styles.css", {
+            "If-None-Match": '"other"', "If-Modified-Since": last_modified
+        })
+        self.assertEqual(response.status, 200)
+
+    def test_changed_file(self):
+        self.cache.interval = 0
+        response, _ = self.get("/styles.css")
+        etag = response.getheader("ETag")
+        self.write("styles.css", b"body {}")
+        response, body = self.get("/styles.css", {"If-None-Match": etag})
+        self.assertEqual((response.status, body), (200, b"body {}"))
+        self.assertNotEqual(response.getheader("ETag"), etag)
+
+
+class TestContentEncoding(ServerTestCase):
+
+    def encoding(self, accept):
+        response, body = self.get("/styles.css", {"Accept-Encoding": accept})
+        encoding = response.getheader("Content-Encoding")
+        if encoding == "gzip":
+            body = gzip.decompress(body)
+        elif encoding == "deflate":
+            body = zlib.decompress(body)
+        self.assertEqual(body, files["styles.css"])
+        return encoding
+
+    def test_negotiation(self):
+        for accept, encoding in [
+            ("gzip", "gzip"),
+            ("deflate", "deflate"),
+            ("gzip, deflate", "gzip"),
+            ("GZIP", "gzip"),
+            ("gzip;q=0, deflate", "deflate"),
+            ("deflate;q=0.5, gzip;q=0.8", "gzip"),
+            ("gzip;q=0.1, *", "deflate"),
+            ("*", "gzip"),
+            ("*;q=0", None),
+            ("gzip;q=0, *;q=0", None),
+            ("gzip;q=x", None),
+            ("br", None),
+            ("identity", None),
+            ("", None),
+        ]:
+            with self.subTest(accept):
+                self.assertEqual(self.encoding(accept), encoding)
+
+    def test_precompressed(self):
+        precompressed = gzip.compress(files["styles.css"], 9, mtime=0)
+        self.write("styles.css.gz", precompressed)
+        response, body = self.get("/styles.css", {"Accept-Encoding": "gzip"})
+        self.assertEqual(body, precompressed)
+        response, body = self.get("/styles.css", {"Accept-Encoding": "deflate"})
+        self.assertEqual(response.getheader("Content-Encoding"), "deflate")
+
+    def test_stale_precompressed(self):
+        self.write("styles.css.gz", gzip.compress(b"stale"))
+        os.utime(os.path.join(self.tmp.name, "styles.css.gz"), ns=(0, 0))
+        response, body = self.get("/styles.css", {"Accept-Encoding": "gzip"})
+        self.assertEqual(gzip.decompress(body), files["styles.css"])
+
+    def test_precompressed_sendfile(self):
+        self.cache.max_file_size = 100
+        precompressed = gzip.compress(files["styles.css"], 9, mtime=0)
+        self.write("styles.css.gz", precompressed)
+        response, body = self.get("/styles.css", {"Accept-Encoding": "deflate, gzip;q=0.5"})
+        self.assertEqual(response.getheader("Content-Encoding"), "gzip")
+        self.assertEqual(response.getheader("Content-Length"), str(len(precompressed)))
+        self.assertEqual(body, precompressed)
+        etag = response.getheader("ETag")
+        self.assertTrue(etag.endswith('-gzip"'))
+        response, body = self.get("/styles.css", {"Accept-Encoding": "gzip", "If-None-Match": etag})
+        self.assertEqual(response.status, 304)
+        response, body = self.get("/styles.css", {"Accept-Encoding": "deflate"})
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        self.assertEqual(body, files["styles.css"])
+        os.utime(os.path.join(self.tmp.name, "styles.css.gz"), ns=(0, 0))
+        response, body = self.get("/styles.css", {"Accept-Encoding": "gzip"})
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        self.assertEqual(body, files["styles.css"])
+
+    def test_etag_per_encoding(self):
+        etags = {}
+        for accept in ["identity", "gzip", "deflate"]:
+            response, _ = self.get("/styles.css", {"Accept-Encoding": accept})
+            etags[accept] = response.getheader("ETag")
+        self.assertEqual(len(set(etags.values())), 3)
+        response, _ = self.get("/styles.css", {
+            "Accept-Encoding": "gzip", "If-None-Match": etags["gzip"]
+        })
+        self.assertEqual(response.status, 304)
+        self.assertEqual(response.getheader("ETag"), etags["gzip"])
+        response, _ = self.get("/styles.css", {
+            "Accept-Encoding": "deflate", "If-None-Match": etags["gzip"]
+        })
+        self.assertEqual(response.status, 200)
+
+    def test_vary(self):
+        response, _ = self.get("/styles.css")
+        self.assertEqual(response.getheader("Vary"), "Accept-Encoding")
+        response, _ = self.get("/index.html", {"Accept-Encoding": "gzip"})
+        self.assertEqual(response.getheader("Vary"), "Accept-Encoding")
+        response, body = self.get("/data.bin", {"Accept-Encoding": "gzip"})
+        self.assertIsNone(response.getheader("Vary"))
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        self.assertEqual(body, files["data.bin"])
+
+    def test_incompressible(self):
+        self.write("random.txt", os.urandom(1000))
+        response, _ = self.get("/random.txt", {"Accept-Encoding": "gzip"})
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        self.assertEqual(response.getheader("Vary"), "Accept-Encoding")
+
+
+class TestRange(ServerTestCase):
+
+    data = files["data.bin"]
+
+    def check(self, header, status, content_range=None, body=None, headers={}):
+        response, data = self.get("/data.bin", dict(headers, Range=header))
+        self.assertEqual(response.status, status)
+        self.assertEqual(response.getheader("Content-Range"), content_range)
+        self.assertEqual(response.getheader("Accept-Ranges"), "bytes")
+        if body is not None:
+            self.assertEqual(data, body)
+            self.assertEqual(response.getheader("Content-Length"), str(len(body)))
+        return response
+
+    def ranges(self):
+        size = len(self.data)
+        for header, start, end in [
+            ("bytes=0-99", 0, 100),
+            ("bytes=1000-", 1000, size),
+            ("bytes=1023-1023", 1023, size),
+            ("bytes=100-5000", 100, size),
+            ("bytes=-100", size - 100, size),
+            ("bytes=-5000", 0, size),
+            (" bytes= 10-19 ", 10, 20),
+        ]:
+            with self.subTest(header):
+                self.check(header, 206, f"bytes {start}-{end - 1}/{size}", self.data[start:end])
+        for header in ["bytes=-0", "bytes=1024-", "bytes=5000-6000"]:
+            with self.subTest(header):
+                self.check(header, 416, f"bytes */{size}", b"")
+        # reversed, multiple, other units and malformed ranges get it all
+        for header in ["bytes=5-2", "bytes=0-1,5-6", "items=0-1", "bytes=a-b", "bytes=-"]:
+            with self.subTest(header):
+                self.check(header, 200, None, self.data)
+
+    def test_ranges(self):
+        self.ranges()
+
+    def test_sendfile_ranges(self):
+        # too large for the cache, sent from the file
+        self.cache.max_file_size = 100
+        self.ranges()
+        self.assertEqual(self.cache.size, 0)
+
+    def test_if_range(self):
+        response, _ = self.get("/data.bin")
+        etag, last_modified = response.getheader("ETag"), response.getheader("Last-Modified")
+        for if_range in [etag, last_modified]:
+            self.check("bytes=0-9", 206, f"bytes 0-9/{len(self.data)}", self.data[:10],
+                       {"If-Range": if_range})
+        for if_range in ['"other"', "W/" + etag, "Thu, 01 Jan 1970 00:00:00 GMT"]:
+            self.check("bytes=0-9", 200, None, self.data, {"If-Range": if_range})
+
+    def test_compressible(self):
+        response, body = self.get("/styles.css", {"Range": "bytes=0-9", "Accept-Encoding": "gzip"})
+        self.assertEqual(response.status, 206)
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        self.assertEqual(body, files["styles.css"][:10])
+
+    def test_head(self):
+        self.cache.max_file_size = 100
+        response, body = self.get("/data.bin", {"Range": "bytes=0-9"}, method="HEAD")
+        self.assertEqual((response.status, body), (206, b""))
+        self.assertEqual(response.getheader("Content-Length"), "10")
+
+
+class TestLiveReload(ServerTestCase):
+
+    workers = 2
+
+    def setUp(self):
+        super().setUp()
+        self.manifest = os.path.join(self.tmp.name, ".manifest.json")
+        self.server.live_reload = LiveReload(self.manifest, interval=0.01)
+
+    def listen(self):
+        conn = self.connect()
+        conn.request("GET", LiveReload.path)
+        response = conn.getresponse()
+        self.assertEqual(response.getheader("Content-Type"), "text/event-stream")
+        return conn, response
+
+    def test_streams_dont_hold_workers(self):
+        streams = [self.listen() for _ in range(self.workers + 1)]
+        start = time.monotonic()
+        response, body = self.get("/styles.css")
+        self.assertEqual(body, files["styles.css"])
+        self.assertLess(time.monotonic() - start, 2)
+        self.write(".manifest.json", b"{}")
+        for conn, response in streams:
+            self.assertEqual(response.readline(), b"data: reload\n")
+            conn.close()
+
+    def test_shutdown_closes_streams(self):
+        conn, response = self.listen()
+        self.stop()
+        self.assertEqual(response.read(), b"")
+        conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()